@@ -1,14 +1,24 @@
-from typing import List, Dict, Any
-from app.core.llm_client import llm_completion
+from typing import AsyncIterator, List, Dict, Any
+from app.core.llm_client import llm_completion, llm_stream
 from datetime import datetime, timezone
 
 class ReaderAgent:
-    def synthesize(self, user_query: str, contexts: List[Dict[str, Any]], history: List[Dict[str, Any]] | None = None) -> str:
+    async def synthesize(self, user_query: str, contexts: List[Dict[str, Any]], history: List[Dict[str, Any]] | None = None, summary: str = "") -> str:
+        return await llm_completion(self.build_prompt(user_query, contexts, history, summary))
+
+    async def synthesize_stream(self, user_query: str, contexts: List[Dict[str, Any]], history: List[Dict[str, Any]] | None = None, summary: str = "") -> AsyncIterator[str]:
+        async for token in llm_stream(self.build_prompt(user_query, contexts, history, summary)):
+            yield token
+
+    def build_prompt(self, user_query: str, contexts: List[Dict[str, Any]], history: List[Dict[str, Any]] | None = None, summary: str = "") -> str:
         history_text = "\n".join(
             [f"Q: {h.get('question')}\nA: {h.get('answer')}" for h in (history or [])]
         )
+        if summary:
+            history_text = f"Summary of earlier turns: {summary}\n{history_text}"
         context_text = "\n".join([c["content"] for c in contexts])
-        now_iso = datetime.now(timezone.utc).astimezone().isoformat()
+        # Same minute-precision clock as the planner, so the LLM client can coalesce repeated questions
+        now_iso = datetime.now(timezone.utc).astimezone().isoformat(timespec="minutes")
         prompt = (
             f"You are a knowledgeable assistant. Use ONLY the provided context (from local PDFs and/or web snippets) to answer.\n"
             f"If web snippets are present, treat them as the most recent source for time-sensitive questions and cite them.\n"
@@ -21,4 +31,4 @@ class ReaderAgent:
             f"{context_text}\n\n"
             "Answer:"
         )
-        return llm_completion(prompt)
+        return prompt
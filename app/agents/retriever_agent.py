@@ -1,24 +1,102 @@
+import asyncio
 from typing import List, Dict, Any
-from app.core.vectorstore import get_vectorstore
-from app.core.embeddings import embed_text
+from app.config import settings
+from app.core.vectorstore import ChromaVectorStore, build_where, get_vectorstore
+from app.core.embeddings import aembed_text, encode_texts
+from app.core.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from app.core.reranker import get_reranker
+
+def _augment(query: str, history: List[Dict[str, Any]] | None) -> str:
+    # Augment the query with the last turn(s) for coreference (e.g., "it", "they")
+    if not history:
+        return query
+    last_turns = history[-2:]  # use up to last 2 turns
+    prior = []
+    for t in last_turns:
+        q = t.get("question")
+        a = t.get("answer")
+        if q:
+            prior.append(f"Q: {q}")
+        if a:
+            prior.append(f"A: {a}")
+    if not prior:
+        return query
+    return "\n".join(prior) + "\nCurrent: " + query
+
+def merge_results(result_lists: List[List[Dict[str, Any]]], exclude=()) -> List[Dict[str, Any]]:
+    """Interleave per-query rankings (best of each first) and drop duplicate chunk ids."""
+    seen = set(exclude)
+    merged = []
+    for rank in range(max((len(r) for r in result_lists), default=0)):
+        for results in result_lists:
+            if rank < len(results) and results[rank]["id"] not in seen:
+                seen.add(results[rank]["id"])
+                merged.append(results[rank])
+    return merged
+
+def _dense_search(vs, embeddings, k, where, namespace):
+    """Dense top-k per embedding, keeping unscoped queries on the shared collection to the default namespace.
+
+    The SQL-backed stores filter ``namespace IS NULL`` before the top-k cut.
+    Chroma can't filter on a missing metadata key, so other namespaces are
+    dropped after the query and the fetch widens until k chunks survive.
+    """
+    if namespace or settings.namespace_collections:
+        return vs.similarity_search_batch(embeddings, k, where)
+    if not isinstance(vs, ChromaVectorStore):
+        default = {"namespace": None}
+        return vs.similarity_search_batch(embeddings, k, {"$and": [where, default]} if where else default)
+    fetch = k
+    while True:
+        batches = vs.similarity_search_batch(embeddings, fetch, where)
+        kept = [[r for r in results if not r["metadata"].get("namespace")] for results in batches]
+        # Short of k only where the collection itself ran out of matches
+        if all(len(ours) >= k or len(results) < fetch for ours, results in zip(kept, batches)):
+            return [ours[:k] for ours in kept]
+        fetch *= 4
+
 
 class RetrieverAgent:
-    def retrieve(self, query: str, k: int = 5, history: List[Dict[str, Any]] | None = None) -> List[Dict[str, Any]]:
-        vs = get_vectorstore()
-        # Augment the query with the last turn(s) for coreference (e.g., "it", "they")
-        augmented_query = query
-        if history:
-            last_turns = history[-2:]  # use up to last 2 turns
-            prior = []
-            for t in last_turns:
-                q = t.get("question")
-                a = t.get("answer")
-                if q:
-                    prior.append(f"Q: {q}")
-                if a:
-                    prior.append(f"A: {a}")
-            if prior:
-                augmented_query = "\n".join(prior) + "\nCurrent: " + query
-        embedding = embed_text(augmented_query)
-        results = vs.similarity_search(embedding, k)
-        return results  # List of {"content", "metadata"}
+    async def retrieve(self, query: str, k: int = 5, history: List[Dict[str, Any]] | None = None,
+                       filters: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+        """Top-k chunks for ``query``; ``filters`` may restrict to {"doc_ids": [...], "namespace": str}."""
+        # Single queries go through the micro-batcher so concurrent requests share encode calls
+        embedding = await aembed_text(_augment(query, history))
+        return (await self._search([query], [embedding], k, filters))[0]
+
+    async def retrieve_batch(self, queries: List[str], k: int = 5, history: List[Dict[str, Any]] | None = None,
+                             filters: Dict[str, Any] | None = None) -> List[List[Dict[str, Any]]]:
+        """Top-k chunks for each of ``queries``: one encode call and one Chroma query for all of them."""
+        if not queries:
+            return []
+        augmented = [_augment(q, history) for q in queries]
+        embeddings = await asyncio.to_thread(encode_texts, augmented, "query")
+        return await self._search(queries, list(embeddings), k, filters)
+
+    async def _search(self, queries, embeddings, k, filters):
+        # Over-fetch when a cross-encoder will pick the final k
+        final_k = k
+        if settings.rerank_enabled:
+            k = max(k, settings.rerank_candidates)
+        doc_ids = (filters or {}).get("doc_ids")
+        namespace = (filters or {}).get("namespace")
+        where = build_where(doc_ids, namespace)
+        # Chroma and SQLite are blocking; keep them off the event loop
+        vs = await asyncio.to_thread(get_vectorstore, namespace)
+        if not settings.hybrid_search_enabled:
+            batches = await asyncio.to_thread(_dense_search, vs, embeddings, k, where, namespace)
+        else:
+            # Lexical search uses the raw question so exact identifiers aren't diluted by history
+            n = max(k, settings.hybrid_candidates)
+            lex = get_lexical_index()
+            dense, lexical = await asyncio.gather(
+                asyncio.to_thread(_dense_search, vs, embeddings, n, where, namespace),
+                asyncio.to_thread(lambda: [lex.search(q, n, doc_ids, namespace) for q in queries]),
+            )
+            batches = [reciprocal_rank_fusion([d, l], k, settings.rrf_k) for d, l in zip(dense, lexical)]
+        if settings.rerank_enabled:
+            reranker = get_reranker()
+            batches = await asyncio.to_thread(
+                lambda: [reranker.rerank(q, r, final_k) if r else r for q, r in zip(queries, batches)]
+            )
+        return batches  # per query: List of {"id", "content", "metadata"}
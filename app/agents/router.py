@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.core.embeddings import encode_texts
+from app.core.metrics import ROUTER_DECISIONS
+
+# Prototype questions for the "needs fresh/external information" class
+WEB_EXEMPLARS = [
+    "What is the latest news today?",
+    "What happened this week in the stock market?",
+    "What is the current price of bitcoin?",
+    "Who won the game last night?",
+    "What is the weather forecast for tomorrow?",
+    "What are the most recent announcements from OpenAI?",
+    "What is the exchange rate right now?",
+    "Any updates on the election results?",
+]
+
+RETRIEVE_PLAN = [{"action": "RETRIEVE", "args": {"k": 5}}, {"action": "ANSWER"}]
+WEB_PLAN = [{"action": "SEARCH_WEB"}, {"action": "ANSWER"}]
+
+_stats = {"fast_retrieve": 0, "fast_web": 0, "escalated": 0}
+_stats_lock = threading.Lock()
+_exemplars = None
+
+
+def _exemplar_matrix() -> np.ndarray:
+    global _exemplars
+    if _exemplars is None:
+        vecs = np.asarray(encode_texts(WEB_EXEMPLARS), dtype=np.float32)
+        _exemplars = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    return _exemplars
+
+
+def _record(outcome: str):
+    with _stats_lock:
+        _stats[outcome] += 1
+    ROUTER_DECISIONS.labels(route=outcome).inc()
+
+
+def router_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        counts = dict(_stats)
+    total = sum(counts.values())
+    fast = counts["fast_retrieve"] + counts["fast_web"]
+    return {**counts, "total": total, "fast_path_rate": fast / total if total else 0.0}
+
+
+class FastPathRouter:
+    """Decide the plan locally when the signals are unambiguous.
+
+    Signals are the best dense retrieval score for the question and its
+    similarity to prototype "fresh information" questions. Strong document
+    match and weak recency signal -> RETRIEVE; no document match and strong
+    recency signal (or an empty corpus) -> SEARCH_WEB; anything else is
+    escalated to the LLM planner.
+    """
+
+    async def route(self, question_embedding, retrieved: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]] | None, Dict[str, Any]]:
+        exemplars = await asyncio.to_thread(_exemplar_matrix)
+        q = np.asarray(question_embedding, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        web_sim = float(np.max(exemplars @ q))
+        doc_score = max((r.get("score", 0.0) for r in retrieved), default=0.0)
+        info = {"web_similarity": round(web_sim, 4), "doc_score": round(doc_score, 4)}
+
+        if doc_score >= settings.router_doc_score_high and web_sim < settings.router_web_similarity_high:
+            _record("fast_retrieve")
+            return [dict(step) for step in RETRIEVE_PLAN], {**info, "route": "fast_retrieve"}
+        if not retrieved or (doc_score < settings.router_doc_score_low and web_sim >= settings.router_web_similarity_high):
+            _record("fast_web")
+            return [dict(step) for step in WEB_PLAN], {**info, "route": "fast_web"}
+        _record("escalated")
+        return None, {**info, "route": "escalated"}
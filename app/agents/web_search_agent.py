@@ -1,5 +1,6 @@
+from typing import List
 from app.core.web_search import search_web
 
 class WebSearchAgent:
-    def search(self, query: str) -> str:
-        return search_web(query)
+    async def search(self, query: str, extra_queries: List[str] | None = None) -> str:
+        return await search_web(query, extra_queries)
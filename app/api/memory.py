@@ -11,7 +11,7 @@ class ClearRequest(BaseModel):
 async def clear_memory_endpoint(request: ClearRequest):
     try:
         session = SessionMemory(request.session_id)
-        session.clear()
+        await session.clear()
         return {"status": "cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -21,6 +21,7 @@ async def clear_memory_endpoint(request: ClearRequest):
 async def get_history(session_id: str = Query(...)):
     try:
         session = SessionMemory(session_id)
-        return {"session_id": session_id, "history": session.history()}
+        memory = await session.load()
+        return {"session_id": session_id, "history": memory["turns"], "summary": memory["summary"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
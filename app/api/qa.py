@@ -1,8 +1,21 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
-from app.core.graph import build_graph
+from typing import List, Dict, Any, Optional
+import asyncio
+import json
+import threading
+import time
+from app.core.context_packer import ContextPacker, count_tokens
+from app.agents.reader_agent import ReaderAgent
+from app.agents.retriever_agent import RetrieverAgent
 from app.core.session_memory import SessionMemory
+from app.core.answer_cache import AnswerCache
+from app.core.embeddings import get_embedding_cache
+from app.agents.router import router_stats
+from app.core.metrics import REQUEST_SECONDS, timer, trace_id_var
+from app.core.vectorstore import NAMESPACE_PATTERN
+from app.config import settings
 import logging
 
 router = APIRouter()
@@ -11,20 +24,83 @@ logger = logging.getLogger("qa")
 class AskRequest(BaseModel):
     session_id: str = Field(..., example="uuid")
     question: str
+    # Optional retrieval scope: only these documents and/or this namespace
+    doc_ids: Optional[List[str]] = None
+    namespace: Optional[str] = Field(None, pattern=NAMESPACE_PATTERN)
 
 class AskResponse(BaseModel):
     answer: str
     sources: List[str]
     plan: List[Dict[str, Any]]
+    cached: bool = False
+    timings: Dict[str, float] = {}
+    context_stats: Dict[str, int] = {}
+    trace_id: Optional[str] = None
 
-# Build graph once at module level
+class AskBatchRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1)
+    k: int = Field(5, ge=1, le=50)
+    doc_ids: Optional[List[str]] = None
+    namespace: Optional[str] = Field(None, pattern=NAMESPACE_PATTERN)
+    # Skip the reader and return only the retrieved chunks (retrieval evaluation)
+    retrieve_only: bool = False
+
+class AskBatchItem(BaseModel):
+    question: str
+    answer: Optional[str] = None
+    sources: List[str]
+    chunk_ids: List[str]
+    error: Optional[str] = None
+
+class AskBatchResponse(BaseModel):
+    results: List[AskBatchItem]
+    timings: Dict[str, float] = {}
+
+# Compiled once, on first use or by the startup warm-up (which also pays for importing langgraph)
 _graph = None
+_graph_lock = threading.Lock()
 
 def get_graph():
     global _graph
-    if _graph is None:
-        _graph = build_graph()
-    return _graph
+    with _graph_lock:
+        if _graph is None:
+            from app.core.graph import build_graph
+            _graph = build_graph()
+        return _graph
+
+def _initial_state(request: AskRequest, memory: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "question": request.question,
+        "session_id": request.session_id,
+        "history": memory["turns"],
+        "history_summary": memory["summary"],
+        "filters": {"doc_ids": request.doc_ids, "namespace": request.namespace},
+        "plan": [],
+        "contexts": [],
+        "sources": [],
+        "answer": "",
+        "_retrieval_empty": False,
+        "_cache_hit": False,
+        "timings": {}
+    }
+
+def _finalize(final_state: Dict[str, Any]) -> AskResponse:
+    # Extract results
+    answer = final_state.get("answer", "")
+    sources = final_state.get("sources", [])
+    plan = final_state.get("plan", [])
+    cached = final_state.get("_cache_hit", False)
+    timings = final_state.get("timings", {})
+    context_stats = final_state.get("context_stats", {})
+    
+    # Ensure we have a plan (fallback to default if empty)
+    if not plan:
+        plan = [{"action": "RETRIEVE", "args": {"k": 5}}, {"action": "ANSWER"}]
+    
+    # Ensure we have an answer
+    if not answer:
+        answer = "I apologize, but I was unable to generate a response."
+    return AskResponse(answer=answer, sources=sources, plan=plan, cached=cached, timings=timings, context_stats=context_stats, trace_id=trace_id_var.get())
 
 @router.post("/ask", response_model=AskResponse)
 async def ask_endpoint(request: AskRequest):
@@ -32,40 +108,131 @@ async def ask_endpoint(request: AskRequest):
         session_memory = SessionMemory(request.session_id)
         graph = get_graph()
         
-        # Initialize state
-        initial_state = {
-            "question": request.question,
-            "session_id": request.session_id,
-            "plan": [],
-            "contexts": [],
-            "sources": [],
-            "answer": "",
-            "_needs_web_fallback": False,
-            "_retrieval_empty": False
-        }
-        
         # Run the graph
-        logger.info(f"Running graph for question: {request.question}")
-        final_state = graph.invoke(initial_state)
-        
-        # Extract results
-        answer = final_state.get("answer", "")
-        sources = final_state.get("sources", [])
-        plan = final_state.get("plan", [])
+        logger.info(f"[{trace_id_var.get()}] Running graph for question: {request.question}")
+        with timer(REQUEST_SECONDS, endpoint="ask"):
+            memory = await session_memory.load()
+            final_state = await graph.ainvoke(_initial_state(request, memory))
+            response = _finalize(final_state)
+            
+            # Save to session memory
+            await session_memory.save_turn(request.question, response.answer, response.sources)
         
-        # Ensure we have a plan (fallback to default if empty)
-        if not plan:
-            plan = [{"action": "RETRIEVE", "args": {"k": 5}}, {"action": "ANSWER"}]
-        
-        # Ensure we have an answer
-        if not answer:
-            answer = "I apologize, but I was unable to generate a response."
-        
-        # Save to session memory
-        session_memory.save_turn(request.question, answer, sources)
-        
-        logger.info(f"Answer generated, sources: {sources}, plan: {plan}")
-        return AskResponse(answer=answer, sources=sources, plan=plan)
+        logger.info(f"[{response.trace_id}] Answer generated, sources: {response.sources}, plan: {response.plan}, cached: {response.cached}, timings_ms: {response.timings}, tokens_saved: {response.context_stats.get('tokens_saved', 0)}")
+        return response
     except Exception as e:
         logger.exception("QA endpoint error")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/ask/stream")
+async def ask_stream_endpoint(request: AskRequest):
+    """Server-sent events: ``plan`` and ``sources`` as graph nodes finish, ``token``
+    deltas from the reader, then ``done`` with the full AskResponse (or ``error``)."""
+    session_memory = SessionMemory(request.session_id)
+    graph = get_graph()
+    events: asyncio.Queue = asyncio.Queue()
+    logger.info(f"[{trace_id_var.get()}] Streaming graph for question: {request.question}")
+    start = time.perf_counter()
+    memory = await session_memory.load()
+    run = asyncio.create_task(graph.ainvoke(_initial_state(request, memory), config={"configurable": {"events": events}}))
+
+    async def stream():
+        try:
+            while True:
+                get = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({get, run}, return_when=asyncio.FIRST_COMPLETED)
+                if get in done:
+                    yield _sse(*get.result())
+                    continue
+                get.cancel()
+                break
+            while not events.empty():
+                yield _sse(*events.get_nowait())
+            response = _finalize(run.result())
+            if response.cached:
+                yield _sse("plan", response.plan)
+                yield _sse("sources", response.sources)
+                yield _sse("token", response.answer)
+            await session_memory.save_turn(request.question, response.answer, response.sources)
+            REQUEST_SECONDS.labels(endpoint="ask_stream").observe(time.perf_counter() - start)
+            yield _sse("done", response.model_dump())
+        except Exception as e:
+            logger.exception("QA stream error")
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            # Client went away mid-stream: stop the graph too
+            if not run.done():
+                run.cancel()
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.post("/ask_batch", response_model=AskBatchResponse)
+async def ask_batch_endpoint(request: AskBatchRequest):
+    """Offline evaluation: answer many standalone questions with a fixed
+    retrieve-then-answer plan. Retrieval runs in batches (one encode call and one
+    Chroma query per batch); reader calls run with bounded concurrency. No
+    planner, web search, answer cache or session memory."""
+    if len(request.questions) > settings.ask_batch_max_questions:
+        raise HTTPException(status_code=400, detail=f"At most {settings.ask_batch_max_questions} questions per batch")
+    try:
+        filters = {"doc_ids": request.doc_ids, "namespace": request.namespace}
+        retriever = RetrieverAgent()
+        timings = {}
+        start = time.perf_counter()
+        retrieved: List[List[Dict[str, Any]]] = []
+        size = settings.ask_batch_retrieval_size
+        for i in range(0, len(request.questions), size):
+            retrieved.extend(await retriever.retrieve_batch(request.questions[i:i + size], k=request.k, filters=filters))
+        timings["retrieve"] = round((time.perf_counter() - start) * 1000, 2)
+
+        reader = ReaderAgent()
+        semaphore = asyncio.Semaphore(settings.ask_batch_concurrency)
+
+        async def answer(question: str, contexts: List[Dict[str, Any]]) -> AskBatchItem:
+            item = AskBatchItem(question=question, sources=[c["metadata"]["source"] for c in contexts],
+                                chunk_ids=[c["id"] for c in contexts])
+            if request.retrieve_only or not contexts:
+                return item
+            packed = ContextPacker().pack(contexts, overhead=count_tokens(reader.build_prompt(question, [])))
+            async with semaphore:
+                try:
+                    item.answer = await reader.synthesize(question, packed["contexts"])
+                except Exception as e:
+                    # One failed completion shouldn't sink the whole evaluation run
+                    item.error = str(e)
+            return item
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(answer(q, c) for q, c in zip(request.questions, retrieved)))
+        timings["reader"] = round((time.perf_counter() - start) * 1000, 2)
+        REQUEST_SECONDS.labels(endpoint="ask_batch").observe((timings["retrieve"] + timings["reader"]) / 1000)
+        logger.info(f"[{trace_id_var.get()}] Batch of {len(results)} questions, timings_ms: {timings}")
+        return AskBatchResponse(results=results, timings=timings)
+    except Exception as e:
+        logger.exception("QA batch endpoint error")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/answer_cache/stats")
+async def answer_cache_stats():
+    try:
+        return await AnswerCache().stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/embedding_cache/stats")
+async def embedding_cache_stats():
+    cache = get_embedding_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+
+@router.get("/router/stats")
+async def planner_router_stats():
+    return router_stats()
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from fastapi.responses import JSONResponse
-from typing import List
+from typing import List, Optional
+import asyncio
 import os
+import re
 import logging
-from app.ingest.ingest_pdfs import ingest
 from app.config import settings
-from app.core.vectorstore import get_vectorstore
+from app.core.vectorstore import NAMESPACE_PATTERN, list_vectorstores
+from app.core.documents import clear_documents
+from app.ingest.jobs import get_job_queue
+from app.ingest.manifest import clear_manifests
+from app.core.lexical_index import get_lexical_index
 
 router = APIRouter()
 logger = logging.getLogger("upload")
@@ -15,84 +20,108 @@ PDFS_DIR = "/app/pdfs"
 os.makedirs(PDFS_DIR, exist_ok=True)
 
 @router.post("/upload")
-async def upload_pdf(files: List[UploadFile] = File(...)):
+async def upload_pdf(files: List[UploadFile] = File(...), namespace: Optional[str] = Form(None)):
     """
-    Upload one or more PDF files and automatically ingest them into the vector store.
+    Upload one or more PDF files and queue them for background ingestion.
+
+    Files can be scoped to a tenant/namespace; /v1/ask then only sees them
+    when it asks for that namespace. Returns a job id immediately; poll
+    /v1/ingest_jobs/{job_id} for progress.
     """
-    results = []
-    total_chunks = 0
+    if namespace and not re.match(NAMESPACE_PATTERN, namespace):
+        raise HTTPException(status_code=400, detail=f"namespace must match {NAMESPACE_PATTERN}")
+    target_dir = os.path.join(PDFS_DIR, namespace) if namespace else PDFS_DIR
+    os.makedirs(target_dir, exist_ok=True)
+    rejected = []
+    accepted = []
     
     for file in files:
         try:
             # Validate file type
             if not file.filename.lower().endswith('.pdf'):
-                results.append({
+                rejected.append({
                     "filename": file.filename,
                     "status": "error",
                     "message": "Only PDF files are allowed"
                 })
                 continue
             
-            # Save uploaded file
-            file_path = os.path.join(PDFS_DIR, file.filename)
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
-            
-            # Ingest the PDF
+            # Stream the upload to disk; rename once complete so a partial file is never ingested
+            file_path = os.path.join(target_dir, file.filename)
+            tmp_path = file_path + ".part"
             try:
-                doc_id = os.path.splitext(file.filename)[0]
-                chunks = ingest(file_path, doc_id=doc_id)
-                total_chunks += chunks
-                
-                results.append({
-                    "filename": file.filename,
-                    "doc_id": doc_id,
-                    "chunks_ingested": chunks,
-                    "status": "success",
-                    "message": f"Successfully ingested {chunks} chunks"
-                })
-            except Exception as ingest_error:
-                logger.exception("Ingestion error")
-                # Clean up uploaded file if ingestion fails
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                results.append({
-                    "filename": file.filename,
-                    "status": "error",
-                    "message": f"Failed to ingest: {str(ingest_error)}"
-                })
+                with open(tmp_path, "wb") as f:
+                    while chunk := await file.read(settings.upload_chunk_size):
+                        await asyncio.to_thread(f.write, chunk)
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                # Disconnect, cancellation or a full disk: don't leave the partial file behind
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            
+            accepted.append({
+                "filename": file.filename,
+                "path": file_path,
+                "doc_id": os.path.splitext(file.filename)[0],
+                "namespace": namespace
+            })
         except Exception as e:
             logger.exception("Upload error")
-            results.append({
+            rejected.append({
                 "filename": file.filename,
                 "status": "error",
                 "message": str(e)
             })
     
-    # Return summary
-    success_count = sum(1 for r in results if r.get("status") == "success")
-    error_count = len(results) - success_count
-    
+    job = get_job_queue().submit(accepted) if accepted else None
     return JSONResponse({
-        "status": "completed",
-        "results": results,
-        "summary": {
-            "total_files": len(results),
-            "successful": success_count,
-            "failed": error_count,
-            "total_chunks_ingested": total_chunks
-        }
-    })
+        "status": "queued" if job else "rejected",
+        "job_id": job["job_id"] if job else None,
+        "job": job,
+        "rejected": rejected
+    }, status_code=202 if job else 200)
+
+@router.get("/ingest_jobs")
+async def list_ingest_jobs():
+    return {"jobs": get_job_queue().list()}
+
+@router.get("/ingest_jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job
+
+@router.delete("/documents/{doc_id}")
+async def delete_document(doc_id: str, namespace: Optional[str] = None):
+    """
+    Queue deletion of one document from the vector store and lexical index.
+
+    Returns a job id immediately; poll /v1/ingest_jobs/{job_id} for the
+    number of chunks deleted so far. Queries see the document either whole
+    or not at all while it is being removed.
+    """
+    if namespace and not re.match(NAMESPACE_PATTERN, namespace):
+        raise HTTPException(status_code=400, detail=f"namespace must match {NAMESPACE_PATTERN}")
+    job = get_job_queue().submit_delete([{"doc_id": doc_id, "namespace": namespace}])
+    return JSONResponse({"status": "queued", "job_id": job["job_id"], "job": job}, status_code=202)
+
+def _clear_all():
+    # Each store swaps in an empty collection/index after in-flight queries drain
+    deleted = sum(vs.clear_all() for vs in list_vectorstores())
+    get_lexical_index().clear()
+    clear_manifests()
+    return deleted
 
 @router.post("/clear_vectorstore")
 async def clear_vectorstore():
     """
-    Clear all ingested documents from ChromaDB vector store.
+    Clear all ingested documents from the vector store.
     """
     try:
-        vs = get_vectorstore()
-        deleted_count = vs.clear_all()
+        deleted_count = await asyncio.to_thread(_clear_all)
+        await clear_documents()
         return JSONResponse({
             "status": "success",
             "deleted_chunks": deleted_count,
@@ -101,4 +130,3 @@ async def clear_vectorstore():
     except Exception as e:
         logger.exception("Clear vectorstore error")
         raise HTTPException(status_code=500, detail=str(e))
-
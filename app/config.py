@@ -1,12 +1,153 @@
 import os
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     openrouter_api_key: str
     openrouter_model: str = "google/gemini-2.5-flash-lite"
+    openrouter_api_url: str = "https://openrouter.ai/api/v1/chat/completions"
     redis_url: str = "redis://redis:6379/0"
+    redis_max_connections: int = 50
     chroma_dir: str = "./data/chroma_db"
+    manifest_dir: str = "./data/manifests"
+    lexical_index_dir: str = "./data/lexical_index"
     searchapi_api_key: str | None = None
+    searchapi_url: str = "https://www.searchapi.io/api/v1/search"
+
+    # Web search: SearchAPI parameters and the shared Redis result cache
+    web_search_tbs: str = "qdr:d"  # last day; "" for no time window
+    web_search_num: int = 8
+    web_search_max_results: int = 12
+    web_search_max_queries: int = 3  # planner reformulations fanned out per request
+    web_search_timeout_seconds: float = 20.0
+    web_search_cache_enabled: bool = True
+    web_search_cache_ttl_seconds: int = 300
+
+    # Shared outbound HTTP pool (LLM + web search)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_timeout_seconds: float = 60.0
+
+    # OpenRouter client: per-attempt timeouts, retries with jittered backoff, concurrency, coalescing
+    llm_timeout_seconds: float = 60.0
+    llm_connect_timeout_seconds: float = 5.0
+    llm_max_retries: int = 3
+    llm_backoff_base_seconds: float = 0.5
+    llm_backoff_max_seconds: float = 20.0
+    llm_max_concurrency_per_model: int = 32
+    llm_coalesce: bool = True
+
+    # Query embedding micro-batching
+    embed_batch_max_size: int = 32
+    embed_batch_max_wait_ms: float = 5.0
+
+    # Persistent embedding cache (memory-mapped, per model)
+    embedding_cache_enabled: bool = True
+    embedding_cache_dir: str = "./data/embedding_cache"
+    embedding_cache_capacity: int = 100_000
+
+    # Chunking: "tokens" (sentence-aware, model tokens) or "words" (legacy windows)
+    chunker: str = "tokens"
+    chunk_max_tokens: int = 256
+    chunk_overlap_tokens: int = 32
+    chunk_span_pages: bool = False
+    chunk_size_words: int = 1000
+    chunk_overlap_words: int = 200
+
+    # Background ingestion
+    ingest_workers: int = 1
+    ingest_job_history: int = 100
+    ingest_embed_batch_size: int = 64
+    ingest_extract_workers: int = 2
+    ingest_pages_per_task: int = 8
+    ingest_max_in_flight: int = 4
+    upload_chunk_size: int = 1 << 20
+    # Ids per page when deleting a document's chunks
+    delete_batch_size: int = 1000
+
+    # Hybrid retrieval (BM25 + dense, reciprocal-rank fusion)
+    hybrid_search_enabled: bool = True
+    hybrid_candidates: int = 20
+    rrf_k: int = 60
+
+    # Vector backend: "chroma", "hnsw" (in-process hnswlib index) or "compact"
+    # (quantized memmap arrays + exact float32 rescoring)
+    vector_backend: str = "chroma"
+    # Distance for new Chroma collections and HNSW indexes: "l2", "cosine" or "ip"
+    vector_metric: str = "l2"
+    # Rows per write when a bulk build (ingest --bulk) hands its buffer to the engine
+    vector_bulk_batch_size: int = 50_000
+    # HNSW graph parameters (Chroma collection metadata, or the in-process index)
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 100
+    hnsw_ef_search: int = 64
+    hnsw_num_threads: int = 0  # 0 = all cores
+    # Chroma: vectors buffered before an index update / index updates before a disk sync
+    hnsw_batch_size: int = 100
+    hnsw_sync_threshold: int = 1000
+    # In-process index: save it every N added vectors (0 = only on flush/shutdown)
+    hnsw_dir: str = "./data/hnsw_index"
+    hnsw_persist_every: int = 10_000
+    compact_store_dir: str = "./data/compact_store"
+    compact_quantization: str = "int8"  # or "float16"
+    compact_rescore_factor: int = 4
+    compact_block_rows: int = 65536
+
+    # Namespaces: one Chroma collection each instead of a metadata filter on the shared one
+    namespace_collections: bool = False
+
+    # Cross-encoder reranking of over-fetched candidates
+    rerank_enabled: bool = False
+    rerank_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    rerank_candidates: int = 50
+    rerank_batch_size: int = 64
+    rerank_max_length: int = 512
+    rerank_cache_size: int = 20_000
+
+    # Local fast-path planner (skips the LLM planner when confident)
+    router_enabled: bool = True
+    router_prefetch_k: int = 5
+    router_doc_score_high: float = 0.45
+    router_doc_score_low: float = 0.2
+    router_web_similarity_high: float = 0.6
+
+    # Start web search in parallel with planning; retrieval scores decide if it's used. Off by default:
+    # it bills a SearchAPI call on every request, including ones the plan answers from the PDFs
+    speculative_web_search: bool = False
+    web_context_min_score: float = 0.3
+
+    # Session memory: recent turns kept verbatim, older ones folded into a rolling summary
+    session_window_turns: int = 6
+    session_summary_enabled: bool = True
+    session_summary_max_chars: int = 2000
+    session_ttl_seconds: int = 7 * 24 * 3600
+
+    # /v1/ask_batch (offline evaluation)
+    ask_batch_max_questions: int = 1000
+    ask_batch_retrieval_size: int = 64
+    ask_batch_concurrency: int = 8
+
+    # Reader prompt packing (token counts estimated from characters)
+    context_budget_tokens: int = 6000
+    context_model_budgets: Dict[str, int] = {}
+    context_history_tokens: int = 1000
+    context_chars_per_token: float = 4.0
+    context_dedup_threshold: float = 0.8
+
+    # Startup: warm the model, vector store and graph in the background (/ready reports 503 until done);
+    # blocking makes the server wait for it before accepting any request
+    warmup_enabled: bool = True
+    warmup_blocking: bool = False
+    ready_redis_timeout_seconds: float = 1.0
+
+    # Observability: return X-Trace-Id on every response
+    trace_id_header: bool = True
+
+    # Semantic answer cache (Redis-backed)
+    answer_cache_enabled: bool = True
+    answer_cache_threshold: float = 0.95
+    answer_cache_ttl_seconds: int = 24 * 3600
+    answer_cache_max_entries: int = 1000
 
     class Config:
         env_file = ".env"
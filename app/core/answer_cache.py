@@ -0,0 +1,148 @@
+import base64
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.config import settings
+from app.core.documents import corpus_fingerprint
+from app.core.metrics import ANSWER_CACHE_LOOKUPS, REDIS_SECONDS, timer
+from app.core.session_memory import get_redis
+
+PREFIX = "answer_cache"
+STATS_KEY = f"{PREFIX}:stats"
+
+
+def _encode(vec) -> str:
+    return base64.b64encode(np.asarray(vec, dtype=np.float32).tobytes()).decode()
+
+
+def _decode(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+class AnswerCache:
+    """Semantic cache of final answers, scoped to the current corpus.
+
+    Per corpus fingerprint, a Redis hash of compact ``created:embedding``
+    values is scanned on lookup, a second hash holds the answers (only the
+    winner is fetched), and a sorted set tracks last access for LRU
+    eviction. Re-ingesting or clearing documents changes the fingerprint,
+    so stale answers are never served.
+    """
+
+    def __init__(self, filters: Dict[str, Any] | None = None):
+        self.redis = get_redis()
+        # Answers scoped to some documents/namespace must not be replayed elsewhere
+        self.filters = {key: sorted(value) if isinstance(value, list) else value
+                        for key, value in (filters or {}).items() if value}
+
+    async def scope(self) -> str:
+        """Cache scope for the corpus as it is now; take it once per request."""
+        scope = await corpus_fingerprint()
+        if self.filters:
+            digest = hashlib.sha1(json.dumps(self.filters, sort_keys=True).encode()).hexdigest()[:12]
+            scope = f"{scope}-{digest}"
+        return scope
+
+    @staticmethod
+    def _keys(scope: str):
+        return f"{PREFIX}:{scope}:entries", f"{PREFIX}:{scope}:vectors", f"{PREFIX}:{scope}:lru"
+
+    async def lookup(self, embedding, scope: str) -> Dict[str, Any] | None:
+        entries_key, vectors_key, lru_key = self._keys(scope)
+        with timer(REDIS_SECONDS, op="answer_cache_lookup"):
+            raw = await self.redis.hgetall(vectors_key)
+        now = time.time()
+        best_id, best_score, expired = None, -1.0, []
+        if raw:
+            query = np.asarray(embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+            ids, vecs = [], []
+            for entry_id, value in raw.items():
+                created, vector = value.split(":", 1)
+                if now - float(created) > settings.answer_cache_ttl_seconds:
+                    expired.append(entry_id)
+                    continue
+                ids.append(entry_id)
+                vecs.append(_decode(vector))
+            if ids:
+                matrix = np.vstack(vecs)
+                scores = matrix @ query / (np.linalg.norm(matrix, axis=1) + 1e-12)
+                i = int(np.argmax(scores))
+                best_id, best_score = ids[i], float(scores[i])
+        if expired:
+            await self._remove(scope, expired)
+        if best_id is not None and best_score >= settings.answer_cache_threshold:
+            payload = await self.redis.hget(entries_key, best_id)
+            if payload is not None:
+                await self.redis.zadd(lru_key, {best_id: now})
+                await self.redis.hincrby(STATS_KEY, "hits", 1)
+                ANSWER_CACHE_LOOKUPS.labels(result="hit").inc()
+                entry = json.loads(payload)
+                return {"answer": entry["answer"], "sources": entry["sources"], "plan": entry["plan"], "score": best_score}
+        await self.redis.hincrby(STATS_KEY, "misses", 1)
+        ANSWER_CACHE_LOOKUPS.labels(result="miss").inc()
+        return None
+
+    async def store(self, scope: str, question: str, embedding, answer: str, sources: List[str],
+                    plan: List[Dict[str, Any]]) -> bool:
+        """Cache an answer under the scope its lookup ran in; skipped if the corpus changed since."""
+        if await self.scope() != scope:
+            await self.redis.hincrby(STATS_KEY, "stale_skips", 1)
+            return False
+        entries_key, vectors_key, lru_key = self._keys(scope)
+        entry_id = uuid.uuid4().hex
+        now = time.time()
+        payload = json.dumps({
+            "question": question,
+            "answer": answer,
+            "sources": sources,
+            "plan": plan,
+            "created": now,
+        })
+        ttl = int(settings.answer_cache_ttl_seconds)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(entries_key, entry_id, payload)
+            pipe.hset(vectors_key, entry_id, f"{now}:{_encode(embedding)}")
+            pipe.zadd(lru_key, {entry_id: now})
+            for key in (entries_key, vectors_key, lru_key):
+                pipe.expire(key, ttl)
+            pipe.zcard(lru_key)
+            pipe.hincrby(STATS_KEY, "stores", 1)
+            with timer(REDIS_SECONDS, op="answer_cache_store"):
+                results = await pipe.execute()
+        overflow = results[6] - settings.answer_cache_max_entries
+        if overflow > 0:
+            evicted = [entry_id for entry_id, _ in await self.redis.zpopmin(lru_key, overflow)]
+            if evicted:
+                await self._remove(scope, evicted)
+                await self.redis.hincrby(STATS_KEY, "evictions", len(evicted))
+        return True
+
+    async def _remove(self, scope: str, entry_ids: List[str]):
+        entries_key, vectors_key, lru_key = self._keys(scope)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hdel(entries_key, *entry_ids)
+            pipe.hdel(vectors_key, *entry_ids)
+            pipe.zrem(lru_key, *entry_ids)
+            await pipe.execute()
+
+    async def stats(self) -> Dict[str, Any]:
+        raw = await self.redis.hgetall(STATS_KEY)
+        counters = {name: int(raw.get(name, 0)) for name in ("hits", "misses", "stores", "stale_skips", "evictions", "invalidations")}
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+        return counters
+
+
+async def invalidate_answer_cache():
+    """Drop every cached answer (all scopes)."""
+    redis = get_redis()
+    keys = [key async for key in redis.scan_iter(match=f"{PREFIX}:*:*")]
+    if keys:
+        await redis.delete(*keys)
+    await redis.hincrby(STATS_KEY, "invalidations", 1)
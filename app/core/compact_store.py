@@ -0,0 +1,286 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.core.metrics import CHROMA_SECONDS, timer
+from app.core.vectorstore import VectorStore, chunk_id
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT UNIQUE, source TEXT, namespace TEXT,
+                                 document TEXT, metadata TEXT, alive INTEGER);
+CREATE INDEX IF NOT EXISTS rows_scope ON rows (namespace, source);
+CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_DTYPES = {"int8": np.int8, "float16": np.float16}
+_FILTER_FIELDS = ("source", "namespace")
+
+
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    return vecs / (np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12)
+
+
+def where_sql(where: Dict[str, Any]):
+    """Translate the subset of Chroma ``where`` produced by ``build_where`` to SQL (plus ``None`` for IS NULL)."""
+    if "$and" in where:
+        parts = [where_sql(clause) for clause in where["$and"]]
+        return " AND ".join(p for p, _ in parts), [v for _, vs in parts for v in vs]
+    (field, cond), = where.items()
+    if field not in _FILTER_FIELDS:
+        raise ValueError(f"Unsupported filter field for the compact store: {field}")
+    if isinstance(cond, dict):
+        values = list(cond["$in"])
+        return f"{field} IN ({','.join('?' * len(values))})", values
+    if cond is None:
+        # Not expressible in Chroma; the retriever only sends it to the SQL-backed stores
+        return f"{field} IS NULL", []
+    return f"{field} = ?", [cond]
+
+
+def source_sql(source: str, namespace: str | None = None):
+    """Exactly one document's rows: ``namespace IS NULL`` for the default namespace, unlike ``where_sql``."""
+    return "source = ? AND namespace IS ?", [source, namespace]
+
+
+def known_rows(conn, ids, chunk=900) -> Dict[str, int]:
+    """Row number of each id already stored, looked up in SQLite-parameter-sized chunks."""
+    known = {}
+    for start in range(0, len(ids), chunk):
+        part = ids[start:start + chunk]
+        known.update(conn.execute(f"SELECT id, row FROM rows WHERE id IN ({','.join('?' * len(part))})", part).fetchall())
+    return known
+
+
+class CompactVectorStore(VectorStore):
+    """VectorStore backed by quantized vectors in memory-mapped NumPy arrays.
+
+    Search scans int8 (per-row scale) or float16 codes block by block, keeps
+    ``rescore_factor * k`` candidates and re-ranks them exactly against the
+    float32 copy, which stays on disk and is only touched for those rows. Ids,
+    documents and metadata live in SQLite; deletes are tombstones and an
+    upsert of a known id overwrites its row in place.
+    """
+    metric = "cosine"
+
+    def __init__(self, directory: str, quantization: str = "int8", rescore_factor: int = 4,
+                 block_rows: int = 65536, initial_capacity: int = 1024):
+        if quantization not in _DTYPES:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.block_rows = block_rows
+        self.initial_capacity = initial_capacity
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(directory, "rows.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        info = dict(self._conn.execute("SELECT key, value FROM info").fetchall())
+        if info.get("quantization", quantization) != quantization:
+            raise ValueError(f"{directory} holds {info['quantization']} vectors; clear it before switching to {quantization}")
+        self.dim = int(info["dim"]) if "dim" in info else None
+        self.count = int(info.get("count", 0))
+        self.capacity = 0
+        self._codes = self._scales = self._vectors = None
+        self._alive = np.zeros(0, dtype=bool)
+        if self.dim is not None:
+            self._map(max(int(info["capacity"]), self.initial_capacity))
+            alive = np.zeros(self.capacity, dtype=bool)
+            rows = [r for r, in self._conn.execute("SELECT row FROM rows WHERE alive = 1")]
+            alive[rows] = True
+            self._alive = alive
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _map(self, capacity: int):
+        """(Re)open the memmaps with room for ``capacity`` rows, growing the files if needed."""
+        specs = [("codes.bin", _DTYPES[self.quantization], (capacity, self.dim)),
+                 ("vectors.f32", np.float32, (capacity, self.dim))]
+        if self.quantization == "int8":
+            specs.append(("scales.f32", np.float32, (capacity,)))
+        maps = []
+        for name, dtype, shape in specs:
+            path = self._path(name)
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            with open(path, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            maps.append(np.memmap(path, dtype=dtype, mode="r+", shape=shape))
+        self._codes, self._vectors = maps[0], maps[1]
+        self._scales = maps[2] if len(maps) > 2 else None
+        if len(self._alive) < capacity:
+            self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+        self.capacity = capacity
+
+    def _quantize(self, vecs: np.ndarray):
+        if self.quantization == "float16":
+            return vecs.astype(np.float16), None
+        scales = np.abs(vecs).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(vecs / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _save_info(self):
+        self._conn.executemany("INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)", [
+            ("dim", str(self.dim)), ("count", str(self.count)),
+            ("capacity", str(self.capacity)), ("quantization", self.quantization),
+        ])
+
+    def _add_chunks(self, contents, embeddings, metadatas):
+        ids = [chunk_id(m) for m in metadatas]
+        vecs = _normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock, self._conn, timer(CHROMA_SECONDS, op="upsert"):
+            if self.dim is None:
+                self.dim = vecs.shape[1]
+                self._map(self.initial_capacity)
+            known = known_rows(self._conn, ids)
+            rows = []
+            for cid in ids:
+                row = known.get(cid)
+                if row is None:
+                    row = known[cid] = self.count
+                    self.count += 1
+                rows.append(row)
+            if self.count > self.capacity:
+                self._map(max(self.capacity * 2, self.count))
+            codes, scales = self._quantize(vecs)
+            self._vectors[rows] = vecs
+            self._codes[rows] = codes
+            if scales is not None:
+                self._scales[rows] = scales
+            self._alive[rows] = True
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (row, id, source, namespace, document, metadata, alive) VALUES (?, ?, ?, ?, ?, ?, 1)",
+                [(row, cid, m.get("source"), m.get("namespace"), doc, json.dumps(m))
+                 for row, cid, doc, m in zip(rows, ids, contents, metadatas)],
+            )
+            self._save_info()
+
+    def similarity_search_batch(self, embeddings, k=5, where=None):
+        if not len(embeddings):
+            return []
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+        with timer(CHROMA_SECONDS, op="query_filtered" if where else "query"):
+            # Snapshot under the lock, scan outside it: _map only ever swaps in new memmap objects
+            # over files that grow, so these references stay valid while writers carry on
+            with self._lock:
+                n = self.count
+                if not n:
+                    return [[] for _ in queries]
+                mask = self._alive[:n].copy()
+                codes, scales, vectors = self._codes, self._scales, self._vectors
+                if where:
+                    clause, params = where_sql(where)
+                    allowed = np.zeros(n, dtype=bool)
+                    allowed[[r for r, in self._conn.execute(f"SELECT row FROM rows WHERE alive = 1 AND {clause}", params)
+                             if r < n]] = True
+                    mask &= allowed
+            n_alive = int(mask.sum())
+            if not n_alive:
+                return [[] for _ in queries]
+            keep = min(n_alive, max(k, k * self.rescore_factor))
+            cand_rows = np.zeros((len(queries), 0), dtype=np.int64)
+            cand_scores = np.zeros((len(queries), 0), dtype=np.float32)
+            for start in range(0, n, self.block_rows):
+                end = min(start + self.block_rows, n)
+                block_mask = mask[start:end]
+                if not block_mask.any():
+                    continue
+                scores = queries @ np.asarray(codes[start:end], dtype=np.float32).T
+                if scales is not None:
+                    scores *= scales[start:end]
+                scores[:, ~block_mask] = -np.inf
+                rows = np.broadcast_to(np.arange(start, end), scores.shape)
+                # Running top-`keep` per query over the blocks seen so far
+                cand_scores = np.concatenate([cand_scores, scores], axis=1)
+                cand_rows = np.concatenate([cand_rows, rows], axis=1)
+                if cand_scores.shape[1] > keep:
+                    top = np.argpartition(-cand_scores, keep - 1, axis=1)[:, :keep]
+                    cand_scores = np.take_along_axis(cand_scores, top, axis=1)
+                    cand_rows = np.take_along_axis(cand_rows, top, axis=1)
+            results = []
+            for q, rows, approx in zip(queries, cand_rows, cand_scores):
+                # Exact float32 rescoring of the shortlist (sorted rows read the memmap sequentially)
+                rows = np.sort(rows[np.isfinite(approx)])
+                exact = np.asarray(vectors[rows], dtype=np.float32) @ q
+                order = np.argsort(-exact)[:k]
+                results.append(list(zip(rows[order].tolist(), exact[order].tolist())))
+            wanted = sorted({row for hits in results for row, _ in hits})
+            docs = {}
+            # Rows deleted since the snapshot drop out here; a delete_source holds the lock for the
+            # whole document, so a query still sees all of it or none
+            with self._lock:
+                for i in range(0, len(wanted), 900):
+                    part = wanted[i:i + 900]
+                    for row, cid, text, meta in self._conn.execute(
+                        f"SELECT row, id, document, metadata FROM rows WHERE alive = 1 AND row IN ({','.join('?' * len(part))})", part
+                    ):
+                        docs[row] = (cid, text, json.loads(meta))
+        return [[{"id": docs[row][0], "content": docs[row][1], "metadata": docs[row][2], "score": score}
+                 for row, score in hits if row in docs] for hits in results]
+
+    def delete_ids(self, ids, batch_size=1000):
+        ids = list(ids)
+        with self._lock:
+            for start in range(0, len(ids), batch_size):
+                part = ids[start:start + batch_size]
+                with self._conn, timer(CHROMA_SECONDS, op="delete"):
+                    marks = ",".join("?" * len(part))
+                    rows = [r for r, in self._conn.execute(f"SELECT row FROM rows WHERE id IN ({marks})", part)]
+                    self._conn.execute(f"UPDATE rows SET alive = 0 WHERE id IN ({marks})", part)
+                    self._alive[rows] = False
+        return len(ids)
+
+    def delete_source(self, source, namespace=None, batch_size=1000, progress=None):
+        """Tombstone every row of one document under the store lock, so queries never see part of it."""
+        clause, params = source_sql(source, namespace)
+        with self._lock:
+            ids = [cid for cid, in self._conn.execute(f"SELECT id FROM rows WHERE alive = 1 AND {clause}", params)]
+            deleted = self.delete_ids(ids, batch_size)
+        if progress:
+            progress(chunks_deleted=deleted)
+        return deleted
+
+    def clear_all(self):
+        with self._lock, self._conn:
+            removed = int(self._alive[:self.count].sum())
+            self._codes = self._scales = self._vectors = None
+            for name in ("codes.bin", "vectors.f32", "scales.f32"):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            self._conn.execute("DELETE FROM rows")
+            self._conn.execute("DELETE FROM info")
+            self.dim, self.count, self.capacity = None, 0, 0
+            self._alive = np.zeros(0, dtype=bool)
+        return removed
+
+    def flush(self):
+        with self._lock:
+            for arr in (self._codes, self._scales, self._vectors):
+                if arr is not None:
+                    arr.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            code_bytes = self._codes.nbytes if self._codes is not None else 0
+            scale_bytes = self._scales.nbytes if self._scales is not None else 0
+            return {
+                "quantization": self.quantization,
+                "rows": self.count,
+                "alive": int(self._alive[:self.count].sum()),
+                "capacity": self.capacity,
+                # What a query scans (kept hot in page cache) vs the exact copy read only for rescoring
+                "scan_bytes": code_bytes + scale_bytes,
+                "rescore_bytes": self._vectors.nbytes if self._vectors is not None else 0,
+            }
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
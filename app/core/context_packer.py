@@ -0,0 +1,140 @@
+import math
+from typing import Any, Dict, List, Set, Tuple
+
+from app.config import settings
+
+SHINGLE = 8  # words per shingle when detecting chunk overlap
+
+
+def count_tokens(text: str) -> int:
+    """Cheap, tokenizer-free estimate; OpenRouter models don't share a vocabulary."""
+    return math.ceil(len(text) / settings.context_chars_per_token) if text else 0
+
+
+def budget_for(model: str | None = None) -> int:
+    model = model or settings.openrouter_model
+    return settings.context_model_budgets.get(model, settings.context_budget_tokens)
+
+
+def _shingles(words: List[str]) -> List[Tuple[str, ...]]:
+    if len(words) < SHINGLE:
+        return [tuple(words)] if words else []
+    return [tuple(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)]
+
+
+def _priority(ctx: Dict[str, Any]) -> float:
+    # Web snippets and other unscored context were added on purpose; keep them first
+    for key in ("rerank", "rrf"):
+        if key in ctx:
+            return ctx[key]
+    return ctx.get("score", math.inf)
+
+
+def _turn_text(turn: Dict[str, Any]) -> str:
+    return f"Q: {turn.get('question')}\nA: {turn.get('answer')}"
+
+
+class ContextPacker:
+    """Fit retrieved chunks and conversation history into a prompt token budget.
+
+    Chunks are ranked by retrieval score, stripped of text already contributed by
+    a higher-ranked chunk (the word/token overlap between neighbouring chunks),
+    dropped when they are mostly duplicates, and then added greedily until the
+    budget is spent. History keeps the newest turns whole and clips older ones.
+    """
+
+    def __init__(self, budget: int | None = None):
+        self.budget = budget or budget_for()
+
+    def pack(self, contexts: List[Dict[str, Any]], history: List[Dict[str, Any]] | None = None,
+             summary: str = "", overhead: int = 0) -> Dict[str, Any]:
+        history = history or []
+        tokens_before = overhead + count_tokens(summary) + sum(count_tokens(_turn_text(t)) for t in history) \
+            + sum(count_tokens(c["content"]) for c in contexts)
+
+        history_budget = min(settings.context_history_tokens, max(self.budget - overhead, 0) // 3)
+        packed_history, packed_summary, history_tokens = self._pack_history(history, summary, history_budget)
+
+        remaining = self.budget - overhead - history_tokens
+        ranked = sorted(contexts, key=_priority, reverse=True)
+        seen: Set[Tuple[str, ...]] = set()
+        packed, duplicates, trimmed, dropped = [], 0, 0, 0
+        for ctx in ranked:
+            content, status = self._dedupe(ctx["content"], seen)
+            if status == "duplicate":
+                duplicates += 1
+                continue
+            cost = count_tokens(content)
+            if cost > remaining:
+                dropped += 1
+                continue
+            seen.update(_shingles(content.split()))
+            trimmed += status == "trimmed"
+            packed.append({**ctx, "content": content} if status == "trimmed" else ctx)
+            remaining -= cost
+
+        tokens_after = self.budget - remaining
+        return {
+            "contexts": packed,
+            "history": packed_history,
+            "summary": packed_summary,
+            "stats": {
+                "budget": self.budget,
+                "tokens_before": tokens_before,
+                "tokens_after": tokens_after,
+                "tokens_saved": max(tokens_before - tokens_after, 0),
+                "chunks_in": len(contexts),
+                "chunks_packed": len(packed),
+                "chunks_duplicate": duplicates,
+                "chunks_trimmed": trimmed,
+                "chunks_over_budget": dropped,
+            },
+        }
+
+    def _dedupe(self, content: str, seen: Set[Tuple[str, ...]]) -> Tuple[str, str]:
+        words = content.split()
+        shingles = _shingles(words)
+        if not shingles or not seen:
+            return content, "kept"
+        covered = [s in seen for s in shingles]
+        if sum(covered) / len(covered) >= settings.context_dedup_threshold:
+            return content, "duplicate"
+        # Strip overlap at either edge; a leading run of covered shingles means
+        # those words already appear at the end of a kept neighbour
+        lead = next((i for i, c in enumerate(covered) if not c), len(covered))
+        tail = next((i for i, c in enumerate(reversed(covered)) if not c), len(covered))
+        if not lead and not tail:
+            return content, "kept"
+        end = len(words) - tail
+        if lead:
+            lead += SHINGLE - 1
+        if tail:
+            end = len(words) - tail - SHINGLE + 1
+        kept = words[lead:end]
+        if not kept:
+            return content, "duplicate"
+        return " ".join(kept), "trimmed"
+
+    def _pack_history(self, history: List[Dict[str, Any]], summary: str, budget: int):
+        used = 0
+        if summary:
+            limit = budget // 2 * settings.context_chars_per_token
+            summary = summary[:int(limit)]
+            used += count_tokens(summary)
+        kept: List[Dict[str, Any]] = []
+        for turn in reversed(history):
+            cost = count_tokens(_turn_text(turn))
+            if used + cost <= budget:
+                kept.append(turn)
+                used += cost
+                continue
+            # Clip the answer of the oldest turn that still fits partially, then stop
+            room = budget - used - count_tokens(f"Q: {turn.get('question')}\nA: ...")
+            if room > 0:
+                answer = str(turn.get("answer") or "")[:int(room * settings.context_chars_per_token)]
+                clipped = {**turn, "answer": answer + "..."}
+                kept.append(clipped)
+                used += count_tokens(_turn_text(clipped))
+            break
+        kept.reverse()
+        return kept, summary, used
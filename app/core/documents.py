@@ -0,0 +1,41 @@
+import hashlib
+from app.core.metrics import REDIS_SECONDS, timer
+from app.core.session_memory import get_redis
+
+# Redis hash of doc_id -> content version for everything currently ingested
+VERSIONS_KEY = "documents:versions"
+
+def document_key(doc_id: str, namespace: str | None = None) -> str:
+    """Identity of a document across namespaces (plain doc_id outside any namespace)."""
+    return f"{namespace}/{doc_id}" if namespace else doc_id
+
+def file_version(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+async def set_document_version(doc_id: str, version: str):
+    from app.core.answer_cache import invalidate_answer_cache
+    await get_redis().hset(VERSIONS_KEY, doc_id, version)
+    await invalidate_answer_cache()
+
+async def remove_document(doc_id: str):
+    from app.core.answer_cache import invalidate_answer_cache
+    await get_redis().hdel(VERSIONS_KEY, doc_id)
+    await invalidate_answer_cache()
+
+async def clear_documents():
+    from app.core.answer_cache import invalidate_answer_cache
+    await get_redis().delete(VERSIONS_KEY)
+    await invalidate_answer_cache()
+
+async def corpus_fingerprint() -> str:
+    """Stable digest of the ingested (doc_id, version) set."""
+    with timer(REDIS_SECONDS, op="document_versions"):
+        versions = await get_redis().hgetall(VERSIONS_KEY)
+    h = hashlib.sha1()
+    for doc_id in sorted(versions):
+        h.update(f"{doc_id}={versions[doc_id]}\n".encode())
+    return h.hexdigest()[:16]
@@ -0,0 +1,148 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Fixed-capacity on-disk cache of embeddings keyed by normalized-text hash.
+
+    Vectors live in a memory-mapped float32 array of ``capacity`` rows; a JSON
+    index maps text hashes to rows in LRU order. Each model gets its own
+    directory and the index records the model name and dimension, so a model
+    change can never return another model's vectors.
+
+    Every row also stores the hash of the text it holds and reads check it,
+    so an index that is stale after a crash, or a row another process
+    (uvicorn worker, ingest CLI) reused, is a miss rather than a wrong
+    vector. Row access is serialized across processes with a file lock.
+    """
+
+    FORMAT = 2
+
+    def __init__(self, directory: str, model_name: str, dim: int, capacity: int, flush_every: int = 1000):
+        self.model_name = model_name
+        self.dim = dim
+        self.capacity = capacity
+        self.flush_every = flush_every
+        self.directory = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        os.makedirs(self.directory, exist_ok=True)
+        self._index_path = os.path.join(self.directory, "index.json")
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._keys_path = os.path.join(self.directory, "keys.bin")
+        self._lock_file = open(os.path.join(self.directory, "lock"), "a+")
+        self._lock = threading.Lock()
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free = []
+        self._dirty = 0
+        self.hits = self.misses = self.evictions = 0
+        self._open()
+
+    def _open(self):
+        header = None
+        if all(os.path.exists(p) for p in (self._index_path, self._vectors_path, self._keys_path)):
+            try:
+                with open(self._index_path) as f:
+                    header = json.load(f)
+            except json.JSONDecodeError:
+                header = None
+        valid = header is not None and header.get("format") == self.FORMAT and header.get("model") == self.model_name \
+            and header.get("dim") == self.dim and header.get("capacity") == self.capacity
+        mode = "r+" if valid else "w+"
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+        # sha1 of the text each row holds (all zeros: empty)
+        self._keys = np.memmap(self._keys_path, dtype=np.uint8, mode=mode, shape=(self.capacity, 20))
+        if valid:
+            self._slots = OrderedDict(header["slots"])
+        used = set(self._slots.values())
+        self._free = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def get_many(self, texts):
+        """Return a list aligned with ``texts``: cached vector or None."""
+        out = []
+        with self._lock, self._file_lock(exclusive=False):
+            for text in texts:
+                key = text_key(text)
+                slot = self._slots.get(key)
+                if slot is not None and self._keys[slot].tobytes() != bytes.fromhex(key):
+                    # Row reused since this index was written (crash or another process)
+                    del self._slots[key]
+                    slot = None
+                if slot is None:
+                    self.misses += 1
+                    out.append(None)
+                else:
+                    self.hits += 1
+                    self._slots.move_to_end(key)
+                    out.append(np.array(self._vectors[slot]))
+        return out
+
+    def put_many(self, texts, vectors):
+        with self._lock, self._file_lock(exclusive=True):
+            for text, vec in zip(texts, vectors):
+                key = text_key(text)
+                slot = self._slots.get(key)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        _, slot = self._slots.popitem(last=False)
+                        self.evictions += 1
+                self._slots[key] = slot
+                self._slots.move_to_end(key)
+                self._vectors[slot] = vec
+                self._keys[slot] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+                self._dirty += 1
+            if self._dirty >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._dirty:
+            return
+        self._vectors.flush()
+        self._keys.flush()
+        tmp = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"format": self.FORMAT, "model": self.model_name, "dim": self.dim, "capacity": self.capacity,
+                       "slots": list(self._slots.items())}, f)
+        os.replace(tmp, self._index_path)
+        self._dirty = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "entries": len(self._slots),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,16 +1,136 @@
-from sentence_transformers import SentenceTransformer
+from concurrent.futures import Future
+import asyncio
+import queue
 import threading
+import time
+import numpy as np
+from app.config import settings
+from app.core.embedding_cache import EmbeddingCache
+from app.core.metrics import EMBED_SECONDS, EMBED_TEXTS, timer
+
+MODEL_NAME = "all-MiniLM-L6-v2"
 
 _lock = threading.Lock()
 _model = None
+_batcher = None
+_cache = None
+_cache_lock = threading.Lock()
 
 def get_model():
     global _model
     with _lock:
         if _model is None:
-            _model = SentenceTransformer("all-MiniLM-L6-v2")
+            # torch/sentence_transformers load here, not when the app is imported
+            from sentence_transformers import SentenceTransformer
+            _model = SentenceTransformer(MODEL_NAME)
         return _model
 
+def get_embedding_cache() -> EmbeddingCache | None:
+    global _cache
+    if not settings.embedding_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            dim = get_model().get_sentence_embedding_dimension()
+            _cache = EmbeddingCache(settings.embedding_cache_dir, MODEL_NAME, dim, settings.embedding_cache_capacity)
+        return _cache
+
+def flush_embedding_cache():
+    if _cache is not None:
+        _cache.flush()
+
+def _encode(texts, source):
+    EMBED_TEXTS.labels(source=source).observe(len(texts))
+    with timer(EMBED_SECONDS, source=source):
+        return get_model().encode(texts)
+
+def encode_texts(texts, source="ingest"):
+    """Encode ``texts`` with the model, serving repeats from the on-disk cache."""
+    cache = get_embedding_cache()
+    if cache is None:
+        return _encode(texts, source)
+    vectors = cache.get_many(texts)
+    missing = {}
+    for i, vec in enumerate(vectors):
+        if vec is None:
+            missing.setdefault(texts[i], []).append(i)
+    if missing:
+        unique = list(missing)
+        fresh = _encode(unique, source)
+        cache.put_many(unique, fresh)
+        for text, vec in zip(unique, fresh):
+            for i in missing[text]:
+                vectors[i] = vec
+    if not vectors:
+        return np.zeros((0, get_model().get_sentence_embedding_dimension()), dtype=np.float32)
+    return np.vstack(vectors)
+
+class CachedEmbedder:
+    """Drop-in for the model's ``encode`` used by ingestion."""
+
+    def encode(self, texts):
+        return encode_texts(list(texts))
+
+def get_embedder() -> CachedEmbedder:
+    return CachedEmbedder()
+
+class EmbeddingBatcher:
+    """Coalesce concurrent embed requests into batched model.encode calls.
+
+    A single worker thread owns the model. It waits up to ``max_wait_ms`` after
+    the first request for more to arrive, encodes up to ``max_batch_size``
+    texts at once and resolves each caller's future with its vector.
+    """
+
+    def __init__(self, max_batch_size: int, max_wait_ms: float):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Drop requests whose callers have already given up
+            batch = [(text, fut) for text, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                vectors = encode_texts([text for text, _ in batch], source="query")
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), vec in zip(batch, vectors):
+                fut.set_result(vec)
+
+def get_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        with _lock:
+            if _batcher is None:
+                _batcher = EmbeddingBatcher(settings.embed_batch_max_size, settings.embed_batch_max_wait_ms)
+    return _batcher
+
 def embed_text(text: str):
-    model = get_model()
-    return model.encode([text])[0]
+    return get_batcher().submit(text).result()
+
+async def aembed_text(text: str):
+    return await asyncio.wrap_future(get_batcher().submit(text))
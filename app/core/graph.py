@@ -1,23 +1,98 @@
+import asyncio
+import time
 from typing import Dict, Any, List
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 
 from app.agents.planner import PlannerAgent
-from app.agents.retriever_agent import RetrieverAgent
+from app.agents.retriever_agent import RetrieverAgent, merge_results
 from app.agents.reader_agent import ReaderAgent
 from app.agents.web_search_agent import WebSearchAgent
-from app.core.session_memory import SessionMemory
+from app.agents.router import FastPathRouter
+from app.config import settings
+from app.core.answer_cache import AnswerCache
+from app.core.context_packer import ContextPacker, count_tokens
+from app.core.embeddings import aembed_text
+from app.core.metrics import CONTEXT_TOKENS, NODE_SECONDS
 
 
 # Graph state schema
 class GraphState(dict):
-    # keys: question, session_id, history, plan, contexts, sources, answer
+    # keys: question, session_id, history, history_summary, filters, plan, contexts, sources, answer
+    # (history is loaded once per request by the caller; nodes never hit Redis for it)
     pass
 
 
-def node_planner(state: GraphState) -> GraphState:
-    session = SessionMemory(state["session_id"])
-    planner = PlannerAgent()
-    plan = planner.plan(state["question"], session)
+def emit(config: RunnableConfig | None, event: str, data: Any):
+    """Push a progress event to the streaming sink, if the caller supplied one."""
+    sink = ((config or {}).get("configurable") or {}).get("events")
+    if sink is not None:
+        sink.put_nowait((event, data))
+
+
+def _streaming(config: RunnableConfig | None) -> bool:
+    return ((config or {}).get("configurable") or {}).get("events") is not None
+
+
+async def node_cache_lookup(state: GraphState) -> GraphState:
+    """Serve a semantically equivalent cached answer and skip the graph."""
+    state["_cache_hit"] = False
+    if not settings.answer_cache_enabled:
+        return state
+    # Follow-up questions depend on the conversation, so only standalone ones are cached
+    if state.get("history") or state.get("history_summary"):
+        return state
+    embedding = await aembed_text(state["question"])
+    state["_question_embedding"] = embedding.tolist()
+    cache = AnswerCache(state.get("filters"))
+    # The store at the end reuses this scope, so an answer is never filed under a newer corpus
+    state["_cache_scope"] = await cache.scope()
+    hit = await cache.lookup(embedding, state["_cache_scope"])
+    if hit:
+        state["answer"] = hit["answer"]
+        state["sources"] = hit["sources"]
+        state["plan"] = hit["plan"]
+        state["_cache_hit"] = True
+    return state
+
+
+async def node_cache_store(state: GraphState) -> GraphState:
+    embedding = state.get("_question_embedding")
+    answer = state.get("answer")
+    # Web answers are time-sensitive; never replay them
+    if embedding is None or not answer or "web" in state.get("sources", []):
+        return state
+    await AnswerCache(state.get("filters")).store(state["_cache_scope"], state["question"], embedding, answer,
+                                                  state.get("sources", []), state.get("plan", []))
+    return state
+
+
+async def node_planner(state: GraphState, config: RunnableConfig) -> GraphState:
+    question = state["question"]
+    history = state.get("history", [])
+    k = settings.router_prefetch_k
+    # Speculatively start retrieval (and web search, if configured) alongside planning
+    retrieval = asyncio.create_task(RetrieverAgent().retrieve(question, k=k, history=history, filters=state.get("filters")))
+    web = None
+    if settings.speculative_web_search and settings.searchapi_api_key:
+        web = asyncio.create_task(WebSearchAgent().search(question))
+    try:
+        plan = None
+        if settings.router_enabled:
+            # Local fast path: let the router skip the LLM planner when confident
+            embedding = state.get("_question_embedding")
+            if embedding is None:
+                embedding = await aembed_text(question)
+            plan, state["_route"] = await FastPathRouter().route(embedding, await retrieval)
+        if plan is None:
+            planner = PlannerAgent()
+            plan = await planner.plan(question, history, state.get("history_summary", ""))
+        state["_prefetched"] = {"k": k, "results": await retrieval}
+    except BaseException:
+        for task in (retrieval, web):
+            if task is not None:
+                task.cancel()
+        raise
     
     # Normalize plan to ensure it's a list of dicts
     normalized_plan = []
@@ -35,21 +110,68 @@ def node_planner(state: GraphState) -> GraphState:
             {"action": "ANSWER"}
         ]
     
+    # Routing consumes plan steps as it goes; node_retrieve needs all RETRIEVE args
+    state["_retrieve_steps"] = [step for step in normalized_plan if step.get("action") == "RETRIEVE"]
+    state["_web_queries"] = [
+        q for step in normalized_plan if step.get("action") == "SEARCH_WEB"
+        for q in ((step.get("args") or {}).get("queries") or [])[:settings.web_search_max_queries] if isinstance(q, str)
+    ]
+    # After _web_queries: with reformulations the speculative snippet must not stand in for the fan-out
+    await _decide_web(state, normalized_plan, web)
+    
     state["plan"] = normalized_plan
+    emit(config, "plan", normalized_plan)
     return state
 
 
-def node_retrieve(state: GraphState) -> GraphState:
+async def _decide_web(state: GraphState, plan: List[Dict[str, Any]], web: "asyncio.Task[str] | None"):
+    """Decide from the plan and retrieval scores whether web context is needed.
+
+    The decision is made before the single reader call, so there is no second
+    synthesis round trip. ``web`` is the speculative search, if one was started;
+    it only decides whether that search is already under way.
+    """
+    actions = [step.get("action") for step in plan]
+    top_score = max((r.get("score", 0.0) for r in state["_prefetched"]["results"]), default=0.0)
+    weak_retrieval = "RETRIEVE" in actions and top_score < settings.web_context_min_score and bool(settings.searchapi_api_key)
+    if "SEARCH_WEB" not in actions and not weak_retrieval:
+        if web is not None:
+            # Only stops waiting: the shielded fetch still completes (and is billed), then lands in the cache
+            web.cancel()
+        return
+    if "SEARCH_WEB" not in actions:
+        at = actions.index("ANSWER") if "ANSWER" in actions else len(plan)
+        plan.insert(at, {"action": "SEARCH_WEB"})
+    if web is not None:
+        snippet = await web
+        # Reformulated queries are fanned out by node_search_web; the question itself is cached by now
+        if not state.get("_web_queries"):
+            state["_prefetched_web"] = snippet
+
+
+async def node_retrieve(state: GraphState, config: RunnableConfig) -> GraphState:
     retriever = RetrieverAgent()
-    session = SessionMemory(state["session_id"])
-    k = 5
-    # Find RETRIEVE action in plan to get k value
-    plan_copy = list(state.get("plan", []))
-    for step in plan_copy:
-        if step.get("action") == "RETRIEVE":
-            k = step.get("args", {}).get("k", 5)
-            break
-    results = retriever.retrieve(state["question"], k=k, history=session.history())
+    question = state["question"]
+    steps = state.pop("_retrieve_steps", None) or [{"action": "RETRIEVE", "args": {"k": 5}}]
+    # Honour every RETRIEVE step in one batched call; later ones must not loop back here
+    state["plan"] = [step for step in state.get("plan", []) if step.get("action") != "RETRIEVE"]
+    wanted: Dict[str, int] = {}
+    for step in steps:
+        args = step.get("args") or {}
+        query = args.get("query") or question
+        wanted[query] = max(wanted.get(query, 0), int(args.get("k", 5)))
+    found: Dict[str, List[Dict[str, Any]]] = {}
+    prefetched = state.pop("_prefetched", None)
+    if prefetched and question in wanted and wanted[question] <= prefetched["k"]:
+        found[question] = prefetched["results"][:wanted[question]]
+    pending = [q for q in wanted if q not in found]
+    if pending:
+        k = max(wanted[q] for q in pending)
+        batches = await retriever.retrieve_batch(pending, k=k, history=state.get("history", []), filters=state.get("filters"))
+        for query, batch in zip(pending, batches):
+            found[query] = batch[:wanted[query]]
+    existing = [c["id"] for c in state.get("contexts", []) if "id" in c]
+    results = merge_results([found[q] for q in wanted], exclude=existing)
     state.setdefault("contexts", [])
     state.setdefault("sources", [])
     
@@ -61,25 +183,32 @@ def node_retrieve(state: GraphState) -> GraphState:
         state["sources"].extend([c["metadata"]["source"] for c in results])
         state["_retrieval_empty"] = False
     
+    emit(config, "sources", list(state["sources"]))
     return state
 
 
-def node_search_web(state: GraphState) -> GraphState:
-    web = WebSearchAgent()
-    snippet = web.search(state["question"])  # string
+async def node_search_web(state: GraphState, config: RunnableConfig) -> GraphState:
+    # Empty retrieval and an explicit SEARCH_WEB step can both route here; search once
+    if "web" in state.get("sources", []):
+        return state
+    snippet = state.pop("_prefetched_web", None)
+    if snippet is None:
+        web = WebSearchAgent()
+        snippet = await web.search(state["question"], state.get("_web_queries"))  # string
     state.setdefault("contexts", [])
     state.setdefault("sources", [])
     state["contexts"].append({"content": snippet, "metadata": {"source": "web"}})
     state["sources"].append("web")
     # Clear retrieval_empty flag since we now have web context
     state["_retrieval_empty"] = False
+    emit(config, "sources", list(state["sources"]))
     return state
 
 
-def node_reader(state: GraphState) -> GraphState:
+async def node_reader(state: GraphState, config: RunnableConfig) -> GraphState:
     reader = ReaderAgent()
-    session = SessionMemory(state["session_id"])
-    history = session.history()
+    history = state.get("history", [])
+    summary = state.get("history_summary", "")
     contexts = state.get("contexts", [])
     
     # If no contexts and no answer yet, ensure we have something
@@ -87,38 +216,28 @@ def node_reader(state: GraphState) -> GraphState:
         # This should not happen if graph is correct, but safety check
         return state
     
-    answer = reader.synthesize(state["question"], contexts, history)
-    state["answer"] = answer
+    # Fit chunks and history into the model's prompt budget
+    overhead = count_tokens(reader.build_prompt(state["question"], []))
+    packed = ContextPacker().pack(contexts, history, summary, overhead)
+    contexts, history, summary = packed["contexts"], packed["history"], packed["summary"]
+    stats = packed["stats"]
+    state["context_stats"] = stats
+    CONTEXT_TOKENS.labels(kind="before").inc(stats["tokens_before"])
+    CONTEXT_TOKENS.labels(kind="after").inc(stats["tokens_after"])
     
-    # Check if answer indicates lack of info and web wasn't used - trigger web fallback
-    if answer and any(phrase in answer.lower() for phrase in ["cannot", "don't have", "does not contain", "sorry", "unable to", "no information", "not provided"]) and "web" not in state.get("sources", []):
-        # Set a flag to trigger web search
-        state["_needs_web_fallback"] = True
+    if _streaming(config):
+        parts = []
+        async for token in reader.synthesize_stream(state["question"], contexts, history, summary):
+            parts.append(token)
+            emit(config, "token", token)
+        answer = "".join(parts)
     else:
-        state["_needs_web_fallback"] = False
-    
-    return state
-
-
-def node_web_fallback(state: GraphState) -> GraphState:
-    """Fallback web search when answer indicates lack of information"""
-    web = WebSearchAgent()
-    snippet = web.search(state["question"])
-    state.setdefault("contexts", [])
-    state.setdefault("sources", [])
-    state["contexts"] = [{"content": snippet, "metadata": {"source": "web"}}]
-    state["sources"] = ["web"]
-    # Clear the fallback flags to prevent loops
-    state["_needs_web_fallback"] = False
-    state["_retrieval_empty"] = False
+        answer = await reader.synthesize(state["question"], contexts, history, summary)
+    state["answer"] = answer
     return state
 
 
 def route_edges(state: GraphState) -> str:
-    # Check for web fallback first
-    if state.get("_needs_web_fallback"):
-        return "web_fallback"
-    
     # Drive edges based on the plan computed by the planner
     plan: List[Dict[str, Any]] = state.get("plan", [])
     if not plan:
@@ -155,70 +274,71 @@ def route_after_retrieve(state: GraphState) -> str:
     return route_edges(state)
 
 
-def route_after_web(state: GraphState) -> str:
-    """Route after web search - check plan or fallback"""
-    if state.get("_needs_web_fallback"):
-        return "web_fallback"
-    return route_edges(state)
+def route_after_cache_lookup(state: GraphState) -> str:
+    if state.get("_cache_hit"):
+        return "__end__"
+    return "planner"
 
 
-def route_after_reader(state: GraphState) -> str:
-    """Route after reader - check if web fallback needed, otherwise end"""
-    if state.get("_needs_web_fallback"):
-        return "web_fallback"
-    return "__end__"
+def timed(name: str, fn):
+    """Wrap a node so its wall time (ms) accumulates in state["timings"][name]
+    and is observed in the per-node Prometheus histogram."""
+    takes_config = fn.__code__.co_argcount > 1
+    histogram = NODE_SECONDS.labels(node=name)
 
+    async def node(state: GraphState, config: RunnableConfig) -> GraphState:
+        start = time.perf_counter()
+        result = await (fn(state, config) if takes_config else fn(state))
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed)
+        timings = result.setdefault("timings", {})
+        timings[name] = round(timings.get(name, 0.0) + elapsed * 1000, 2)
+        return result
 
-def route_after_web_fallback(state: GraphState) -> str:
-    """After web fallback, go to reader to synthesize, then end"""
-    return "reader"
+    node.__name__ = fn.__name__
+    return node
 
 
 def build_graph():
     graph = StateGraph(dict)  # Use plain dict instead of GraphState to avoid typing issues
-    graph.add_node("planner", node_planner)
-    graph.add_node("retrieve", node_retrieve)
-    graph.add_node("search_web", node_search_web)
-    graph.add_node("reader", node_reader)
-    graph.add_node("web_fallback", node_web_fallback)
-
-    # Start at planner
-    graph.set_entry_point("planner")
+    graph.add_node("cache_lookup", timed("cache_lookup", node_cache_lookup))
+    graph.add_node("cache_store", timed("cache_store", node_cache_store))
+    graph.add_node("planner", timed("planner", node_planner))
+    graph.add_node("retrieve", timed("retrieve", node_retrieve))
+    graph.add_node("search_web", timed("search_web", node_search_web))
+    graph.add_node("reader", timed("reader", node_reader))
+
+    # Start at the answer cache; a hit ends the run before any LLM call
+    graph.set_entry_point("cache_lookup")
+    graph.add_conditional_edges("cache_lookup", route_after_cache_lookup, {
+        "planner": "planner",
+        "__end__": END
+    })
     
     # Planner routes based on plan
     graph.add_conditional_edges("planner", route_edges, {
         "retrieve": "retrieve",
         "search_web": "search_web",
-        "reader": "reader",
-        "web_fallback": "web_fallback"
+        "reader": "reader"
     })
     
-    # After retrieve, continue with plan or web fallback
+    # After retrieve, continue with plan (or web search if retrieval came back empty)
     graph.add_conditional_edges("retrieve", route_after_retrieve, {
         "retrieve": "retrieve",
         "search_web": "search_web",
-        "reader": "reader",
-        "web_fallback": "web_fallback"
+        "reader": "reader"
     })
     
-    # After web search, continue with plan or web fallback
-    graph.add_conditional_edges("search_web", route_after_web, {
+    # After web search, continue with plan
+    graph.add_conditional_edges("search_web", route_edges, {
         "retrieve": "retrieve",
         "search_web": "search_web",
-        "reader": "reader",
-        "web_fallback": "web_fallback"
-    })
-    
-    # After reader, check if fallback needed or end
-    graph.add_conditional_edges("reader", route_after_reader, {
-        "web_fallback": "web_fallback",
-        "__end__": END
-    })
-    
-    # After web fallback, synthesize final answer
-    graph.add_conditional_edges("web_fallback", route_after_web_fallback, {
         "reader": "reader"
     })
+    
+    # After reader, cache the answer and end
+    graph.add_edge("reader", "cache_store")
+    graph.add_edge("cache_store", END)
 
     app = graph.compile()
     return app
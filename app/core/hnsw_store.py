@@ -0,0 +1,266 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict
+
+import hnswlib
+import numpy as np
+
+from app.core.compact_store import known_rows, source_sql, where_sql
+from app.core.metrics import CHROMA_SECONDS, timer
+from app.core.vectorstore import VectorStore, chunk_id, distance_to_score
+
+logger = logging.getLogger("hnsw_store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT UNIQUE, source TEXT, namespace TEXT,
+                                 document TEXT, metadata TEXT, alive INTEGER);
+CREATE INDEX IF NOT EXISTS rows_scope ON rows (namespace, source);
+CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Filters matching fewer rows than this are scored exactly instead of walking the graph
+_EXACT_BELOW = 2048
+
+
+class HnswVectorStore(VectorStore):
+    """VectorStore backed by an in-process hnswlib index.
+
+    Labels are SQLite row numbers; ids, documents and metadata live in SQLite
+    next to ``index.bin``. Deletes are hnswlib tombstones and an upsert of a
+    known id replaces its vector under the same label. The index is saved
+    every ``persist_every`` added vectors and on flush/close; rows written
+    after the last save are dropped on the next open along with the ingest
+    manifests of their documents, so the next ingest re-embeds them.
+    """
+
+    def __init__(self, directory: str, space: str = "l2", m: int = 16, ef_construction: int = 100,
+                 ef_search: int = 64, num_threads: int = -1, persist_every: int = 10_000,
+                 initial_capacity: int = 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.metric = space
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.num_threads = num_threads
+        self.persist_every = persist_every
+        self.initial_capacity = initial_capacity
+        self._lock = threading.RLock()
+        self._unsaved = 0
+        self._conn = sqlite3.connect(os.path.join(directory, "rows.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        info = dict(self._conn.execute("SELECT key, value FROM info").fetchall())
+        if info.get("space", space) != space:
+            raise ValueError(f"{directory} holds a {info['space']} index; clear it before switching to {space}")
+        self.dim = int(info["dim"]) if "dim" in info else None
+        self.count = int(info.get("count", 0))
+        self._index = None
+        self._alive = np.zeros(0, dtype=bool)
+        if self.dim is not None and os.path.exists(self._path("index.bin")):
+            self._index = hnswlib.Index(space=space, dim=self.dim)
+            self._index.load_index(self._path("index.bin"), max_elements=max(self.count, initial_capacity))
+            self._index.set_ef(ef_search)
+            self._index.set_num_threads(num_threads)
+            self._recover()
+        elif self.dim is not None:
+            # Rows were recorded but the index never reached disk
+            self.dim, self.count = None, 0
+            self._recover()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _recover(self):
+        """Reconcile SQLite with the last saved index: drop unsaved rows, re-apply tombstones."""
+        from app.core.documents import document_key
+        from app.ingest.manifest import delete_manifest
+
+        with self._conn:
+            docs = self._conn.execute("SELECT DISTINCT source, namespace FROM rows WHERE row >= ?", (self.count,)).fetchall()
+            lost = self._conn.execute("DELETE FROM rows WHERE row >= ?", (self.count,)).rowcount
+            if lost:
+                logger.warning("%s: %d rows of %d documents were written after the last index save and were dropped",
+                               self.directory, lost, len(docs))
+        # Their manifests may already say "done"; without them the next ingest re-embeds the documents
+        for source, namespace in docs:
+            delete_manifest(document_key(source, namespace))
+        dead = [r for r, in self._conn.execute("SELECT row FROM rows WHERE alive = 0")]
+        self._alive = np.ones(max(self.count, self.initial_capacity), dtype=bool)
+        self._alive[self.count:] = False
+        self._alive[dead] = False
+        for row in dead:
+            try:
+                self._index.mark_deleted(row)
+            except RuntimeError:
+                pass  # already a tombstone in the saved index
+
+    def _new_index(self, dim: int):
+        index = hnswlib.Index(space=self.metric, dim=dim)
+        index.init_index(max_elements=self.initial_capacity, M=self.m, ef_construction=self.ef_construction)
+        index.set_ef(self.ef_search)
+        index.set_num_threads(self.num_threads)
+        return index
+
+    def set_ef_search(self, ef: int):
+        """Change the query-time beam width without rebuilding the graph."""
+        with self._lock:
+            self.ef_search = ef
+            if self._index is not None:
+                self._index.set_ef(ef)
+
+    def _add_chunks(self, contents, embeddings, metadatas):
+        ids = [chunk_id(m) for m in metadatas]
+        vecs = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            with self._conn, timer(CHROMA_SECONDS, op="upsert"):
+                if self._index is None:
+                    self.dim = vecs.shape[1]
+                    self._index = self._new_index(self.dim)
+                known = known_rows(self._conn, ids)
+                rows = []
+                for cid in ids:
+                    row = known.get(cid)
+                    if row is None:
+                        row = known[cid] = self.count
+                        self.count += 1
+                    rows.append(row)
+                capacity = self._index.get_max_elements()
+                if self.count > capacity:
+                    capacity = max(capacity * 2, self.count)
+                    self._index.resize_index(capacity)
+                if len(self._alive) < capacity:
+                    self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+                # Re-adding a tombstoned label also clears its deleted mark
+                self._index.add_items(vecs, rows, num_threads=self.num_threads)
+                self._alive[rows] = True
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rows (row, id, source, namespace, document, metadata, alive) VALUES (?, ?, ?, ?, ?, ?, 1)",
+                    [(row, cid, m.get("source"), m.get("namespace"), doc, json.dumps(m))
+                     for row, cid, doc, m in zip(rows, ids, contents, metadatas)],
+                )
+            self._unsaved += len(rows)
+            if self.persist_every and self._unsaved >= self.persist_every:
+                self.flush()
+
+    def _exact(self, queries, rows, k):
+        """Brute-force distances over ``rows`` in the index's own metric."""
+        vecs = np.asarray(self._index.get_items(rows), dtype=np.float32)
+        if self.metric == "l2":
+            dists = (queries ** 2).sum(1)[:, None] - 2 * queries @ vecs.T + (vecs ** 2).sum(1)[None, :]
+        else:
+            if self.metric == "cosine":
+                queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12)
+            dists = 1.0 - queries @ vecs.T
+        order = np.argsort(dists, axis=1)[:, :k]
+        return np.asarray(rows)[order], np.take_along_axis(dists, order, axis=1)
+
+    def similarity_search_batch(self, embeddings, k=5, where=None):
+        if not len(embeddings):
+            return []
+        queries = np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+        with self._lock, timer(CHROMA_SECONDS, op="query_filtered" if where else "query"):
+            if self._index is None:
+                return [[] for _ in queries]
+            if where:
+                clause, params = where_sql(where)
+                allowed = [r for r, in self._conn.execute(f"SELECT row FROM rows WHERE alive = 1 AND {clause}", params)]
+            else:
+                allowed = None
+            n = len(allowed) if allowed is not None else int(self._alive.sum())
+            k = min(k, n)
+            if not k:
+                return [[] for _ in queries]
+            if allowed is not None and n < _EXACT_BELOW:
+                labels, dists = self._exact(queries, allowed, k)
+            else:
+                keep = set(allowed).__contains__ if allowed is not None else None
+                try:
+                    labels, dists = self._index.knn_query(queries, k=k, filter=keep)
+                except RuntimeError:
+                    # A selective filter can leave the graph walk short of k hits
+                    labels, dists = self._exact(queries, allowed if allowed is not None else np.flatnonzero(self._alive), k)
+            wanted = sorted({int(row) for row in labels.ravel()})
+            docs = {}
+            for i in range(0, len(wanted), 900):
+                part = wanted[i:i + 900]
+                for row, cid, text, meta in self._conn.execute(
+                    f"SELECT row, id, document, metadata FROM rows WHERE row IN ({','.join('?' * len(part))})", part
+                ):
+                    docs[row] = (cid, text, json.loads(meta))
+        return [[{"id": docs[row][0], "content": docs[row][1], "metadata": docs[row][2],
+                  "score": distance_to_score(self.metric, float(dist))}
+                 for row, dist in zip(rows.tolist(), row_dists)] for rows, row_dists in zip(labels, dists)]
+
+    def delete_ids(self, ids, batch_size=900):
+        ids = list(ids)
+        with self._lock:
+            for start in range(0, len(ids), batch_size):
+                part = ids[start:start + batch_size]
+                with self._conn, timer(CHROMA_SECONDS, op="delete"):
+                    marks = ",".join("?" * len(part))
+                    rows = [r for r, in self._conn.execute(f"SELECT row FROM rows WHERE alive = 1 AND id IN ({marks})", part)]
+                    self._conn.execute(f"UPDATE rows SET alive = 0 WHERE id IN ({marks})", part)
+                    for row in rows:
+                        self._index.mark_deleted(row)
+                    self._alive[rows] = False
+                self._unsaved += len(rows)
+        return len(ids)
+
+    def delete_source(self, source, namespace=None, batch_size=900, progress=None):
+        """Tombstone every row of one document under the store lock, so queries never see part of it."""
+        clause, params = source_sql(source, namespace)
+        with self._lock:
+            ids = [cid for cid, in self._conn.execute(f"SELECT id FROM rows WHERE alive = 1 AND {clause}", params)]
+            deleted = self.delete_ids(ids, batch_size)
+        if progress:
+            progress(chunks_deleted=deleted)
+        return deleted
+
+    def clear_all(self):
+        with self._lock, self._conn:
+            removed = int(self._alive.sum())
+            self._index = None
+            if os.path.exists(self._path("index.bin")):
+                os.remove(self._path("index.bin"))
+            self._conn.execute("DELETE FROM rows")
+            self._conn.execute("DELETE FROM info")
+            self.dim, self.count, self._unsaved = None, 0, 0
+            self._alive = np.zeros(0, dtype=bool)
+        return removed
+
+    def flush(self):
+        """Save the index (atomically, via a temp file) and record how many rows it covers."""
+        with self._lock:
+            if self._index is None or not self._unsaved:
+                return
+            tmp = self._path("index.bin.tmp")
+            self._index.save_index(tmp)
+            os.replace(tmp, self._path("index.bin"))
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)", [
+                    ("dim", str(self.dim)), ("count", str(self.count)), ("space", self.metric),
+                ])
+            self._unsaved = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "metric": self.metric,
+                "M": self.m,
+                "ef_construction": self.ef_construction,
+                "ef_search": self.ef_search,
+                "rows": self.count,
+                "alive": int(self._alive.sum()),
+                "capacity": self._index.get_max_elements() if self._index is not None else 0,
+                "unsaved": self._unsaved,
+            }
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,27 @@
+import asyncio
+import httpx
+from app.config import settings
+
+_client: httpx.AsyncClient | None = None
+_lock = asyncio.Lock()
+
+async def get_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive client used for OpenRouter and SearchAPI calls."""
+    global _client
+    if _client is None:
+        async with _lock:
+            if _client is None:
+                _client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(settings.http_timeout_seconds),
+                    limits=httpx.Limits(
+                        max_connections=settings.http_max_connections,
+                        max_keepalive_connections=settings.http_max_keepalive_connections,
+                    ),
+                )
+    return _client
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
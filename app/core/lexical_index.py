@@ -0,0 +1,185 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from heapq import nlargest
+from typing import Any, Dict, List
+
+from app.config import settings
+
+# Keep identifiers such as "PN-4821", "v2.5" or "ISO_9001" as single tokens
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, source TEXT, length INTEGER, content TEXT, metadata TEXT, namespace TEXT);
+CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source);
+CREATE TABLE IF NOT EXISTS postings (term TEXT, chunk_id TEXT, tf INTEGER, dl INTEGER, PRIMARY KEY (term, chunk_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id);
+CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class LexicalIndex:
+    """SQLite-backed inverted index with Okapi BM25 scoring.
+
+    Postings carry the chunk length so a query needs one lookup per term;
+    corpus size and total length are maintained incrementally.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.k1, self.b = k1, b
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        if "namespace" not in columns:  # index created before namespaces existed
+            self._conn.execute("ALTER TABLE chunks ADD COLUMN namespace TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_namespace ON chunks (namespace, source)")
+
+    def _stat(self, key):
+        row = self._conn.execute("SELECT value FROM stats WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, n_docs, total_len):
+        for key, delta in (("n_docs", n_docs), ("total_len", total_len)):
+            self._conn.execute(
+                "INSERT INTO stats (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                (key, delta),
+            )
+
+    def _delete_locked(self, ids):
+        removed = total = 0
+        for cid in ids:
+            row = self._conn.execute("SELECT length FROM chunks WHERE id = ?", (cid,)).fetchone()
+            if row is None:
+                continue
+            self._conn.execute("DELETE FROM postings WHERE chunk_id = ?", (cid,))
+            self._conn.execute("DELETE FROM chunks WHERE id = ?", (cid,))
+            removed += 1
+            total += row[0]
+        if removed:
+            self._bump(-removed, -total)
+
+    def upsert(self, ids, contents, metadatas):
+        with self._lock, self._conn:
+            self._delete_locked(ids)
+            total = 0
+            for cid, content, meta in zip(ids, contents, metadatas):
+                tokens = tokenize(content)
+                dl = len(tokens)
+                total += dl
+                self._conn.execute(
+                    "INSERT INTO chunks (id, source, length, content, metadata, namespace) VALUES (?, ?, ?, ?, ?, ?)",
+                    (cid, meta.get("source"), dl, content, json.dumps(meta), meta.get("namespace")),
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, chunk_id, tf, dl) VALUES (?, ?, ?, ?)",
+                    [(term, cid, tf, dl) for term, tf in Counter(tokens).items()],
+                )
+            self._bump(len(ids), total)
+
+    def delete(self, ids):
+        with self._lock, self._conn:
+            self._delete_locked(ids)
+
+    def delete_source(self, source: str, namespace: str | None = None) -> int:
+        """Remove every chunk of one document in a single transaction."""
+        with self._lock, self._conn:
+            ids = [cid for cid, in self._conn.execute(
+                "SELECT id FROM chunks WHERE source = ? AND namespace IS ?", (source, namespace)
+            )]
+            self._delete_locked(ids)
+        return len(ids)
+
+    def has_source(self, source: str, namespace: str | None = None) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM chunks WHERE source = ? AND namespace IS ? LIMIT 1", (source, namespace)
+            ).fetchone() is not None
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM stats")
+
+    def search(self, query: str, k: int = 5, doc_ids: List[str] | None = None, namespace: str | None = None) -> List[Dict[str, Any]]:
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        # Always scoped to one namespace (None: the default one), as the dense side is
+        sql = ("SELECT p.chunk_id, p.tf, p.dl FROM postings p JOIN chunks c ON c.id = p.chunk_id"
+               " WHERE p.term = ? AND c.namespace IS ?")
+        scope = [namespace]
+        if doc_ids:
+            sql += f" AND c.source IN ({','.join('?' * len(doc_ids))})"
+            scope.extend(doc_ids)
+        with self._lock:
+            n_docs = self._stat("n_docs")
+            if not n_docs:
+                return []
+            avgdl = self._stat("total_len") / n_docs or 1.0
+            scores: Dict[str, float] = {}
+            for term in terms:
+                rows = self._conn.execute(sql, (term, *scope)).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                for cid, tf, dl in rows:
+                    denom = tf + self.k1 * (1 - self.b + self.b * dl / avgdl)
+                    scores[cid] = scores.get(cid, 0.0) + idf * tf * (self.k1 + 1) / denom
+            top = nlargest(k, scores.items(), key=lambda item: item[1])
+            docs = []
+            for cid, score in top:
+                content, meta = self._conn.execute("SELECT content, metadata FROM chunks WHERE id = ?", (cid,)).fetchone()
+                docs.append({"id": cid, "content": content, "metadata": json.loads(meta), "bm25": score})
+            return docs
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LexicalIndex(os.path.join(settings.lexical_index_dir, "bm25.sqlite"))
+        return _index
+
+
+def close_lexical_index():
+    global _index
+    with _index_lock:
+        if _index is not None:
+            _index.close()
+        _index = None
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], k: int, rrf_k: int = 60) -> List[Dict[str, Any]]:
+    """Fuse ranked lists of {"id", ...} docs by sum of 1 / (rrf_k + rank)."""
+    fused: Dict[str, float] = {}
+    docs: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            fused[doc["id"]] = fused.get(doc["id"], 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(doc["id"], doc)
+    ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+    return [{**docs[cid], "rrf": fused[cid]} for cid in ranked]
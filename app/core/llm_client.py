@@ -1,20 +1,168 @@
+import asyncio
+import hashlib
+import json
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict
 import httpx
 from app.config import settings
+from app.core.http_client import get_http_client
+from app.core.metrics import LLM_CHARS, LLM_COALESCED, LLM_FIRST_TOKEN_SECONDS, LLM_RETRIES, LLM_SECONDS, LLM_TOKENS
 
-API_URL = "https://openrouter.ai/api/v1/chat/completions"
+# Rate limits and transient upstream failures; anything else fails fast
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
 
-def llm_completion(prompt: str, model=None):
+_slots: Dict[str, asyncio.Semaphore] = {}
+_inflight: Dict[str, "asyncio.Task[str]"] = {}
+
+def _request(prompt: str, model=None, stream=False):
     messages = [{"role": "system", "content": prompt}]
     payload = {
         "model": model or settings.openrouter_model,
         "messages": messages
     }
+    if stream:
+        payload["stream"] = True
     headers = {
         "Authorization": f"Bearer {settings.openrouter_api_key}",
         "Content-Type": "application/json"
     }
-    resp = httpx.post(API_URL, json=payload, headers=headers, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
+    return payload, headers
+
+def _record_usage(model: str, prompt: str, completion: str, usage: dict | None):
+    LLM_CHARS.labels(model=model, kind="prompt").inc(len(prompt))
+    LLM_CHARS.labels(model=model, kind="completion").inc(len(completion))
+    if usage:
+        LLM_TOKENS.labels(model=model, kind="prompt").inc(usage.get("prompt_tokens") or 0)
+        LLM_TOKENS.labels(model=model, kind="completion").inc(usage.get("completion_tokens") or 0)
+
+def _slot(model: str) -> asyncio.Semaphore:
+    """Per-model cap on concurrent upstream calls (held across retries as backpressure)."""
+    slot = _slots.get(model)
+    if slot is None:
+        slot = _slots[model] = asyncio.Semaphore(settings.llm_max_concurrency_per_model)
+    return slot
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    value = resp.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def _backoff(attempt: int) -> float:
+    # Full jitter: uniform over [0, base * 2^attempt], capped
+    return random.uniform(0, min(settings.llm_backoff_max_seconds, settings.llm_backoff_base_seconds * 2 ** attempt))
+
+async def _send(payload, headers, stream=False) -> httpx.Response:
+    """POST to OpenRouter, retrying transport errors and RETRY_STATUSES with
+    jittered exponential backoff (or the server's Retry-After). Returns a 2xx
+    response; streamed responses are left open for the caller to read and close."""
+    client = await get_http_client()
+    model = payload["model"]
+    timeout = httpx.Timeout(settings.llm_timeout_seconds, connect=settings.llm_connect_timeout_seconds)
+    attempt = 0
+    while True:
+        try:
+            request = client.build_request("POST", settings.openrouter_api_url, json=payload, headers=headers, timeout=timeout)
+            resp = await client.send(request, stream=stream)
+        except httpx.TransportError as e:
+            if attempt >= settings.llm_max_retries:
+                raise
+            reason, delay = type(e).__name__, _backoff(attempt)
+        else:
+            if resp.status_code not in RETRY_STATUSES or attempt >= settings.llm_max_retries:
+                if resp.is_error and stream:
+                    await resp.aclose()
+                resp.raise_for_status()
+                return resp
+            retry_after = _retry_after(resp)
+            reason = str(resp.status_code)
+            delay = _backoff(attempt) if retry_after is None else min(retry_after, settings.llm_backoff_max_seconds)
+            await resp.aclose()
+        LLM_RETRIES.labels(model=model, reason=reason).inc()
+        attempt += 1
+        await asyncio.sleep(delay)
+
+async def llm_completion(prompt: str, model=None):
+    """Single completion. Identical concurrent prompts share one upstream call."""
+    model = model or settings.openrouter_model
+    if not settings.llm_coalesce:
+        return await _completion(prompt, model)
+    key = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+    task = _inflight.get(key)
+    if task is None:
+        task = _inflight[key] = asyncio.create_task(_completion(prompt, model))
+        task.add_done_callback(lambda t, key=key: _settle(key, t))
+    else:
+        LLM_COALESCED.labels(model=model).inc()
+    # One caller giving up must not cancel the call for everyone else
+    return await asyncio.shield(task)
+
+def _settle(key, task):
+    _inflight.pop(key, None)
+    if not task.cancelled():
+        task.exception()  # mark retrieved even if every waiter went away
+
+async def _completion(prompt: str, model: str):
+    payload, headers = _request(prompt, model)
+    start = time.perf_counter()
+    status = "error"
+    try:
+        async with _slot(model):
+            resp = await _send(payload, headers)
+        status = str(resp.status_code)
+        data = resp.json()
+    except httpx.HTTPStatusError as e:
+        status = str(e.response.status_code)
+        raise
+    finally:
+        LLM_SECONDS.labels(model=model, mode="completion", status=status).observe(time.perf_counter() - start)
     text = data["choices"][0]["message"]["content"]
+    _record_usage(model, prompt, text, data.get("usage"))
     return text
+
+async def llm_stream(prompt: str, model=None) -> AsyncIterator[str]:
+    """Yield content deltas from OpenRouter's streaming (SSE) mode."""
+    payload, headers = _request(prompt, model, stream=True)
+    model = payload["model"]
+    start = time.perf_counter()
+    status = "error"
+    parts, usage = [], None
+    try:
+        # Retries only happen before the first byte; a stream cut mid-answer is not replayed
+        async with _slot(model):
+            resp = await _send(payload, headers, stream=True)
+            status = str(resp.status_code)
+            try:
+                async for line in resp.aiter_lines():
+                    # Skip blank separators and keep-alive comments (": OPENROUTER PROCESSING")
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    usage = chunk.get("usage") or usage
+                    choices = chunk.get("choices") or []
+                    delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                    if delta:
+                        if not parts:
+                            LLM_FIRST_TOKEN_SECONDS.labels(model=model).observe(time.perf_counter() - start)
+                        parts.append(delta)
+                        yield delta
+            finally:
+                await resp.aclose()
+    except httpx.HTTPStatusError as e:
+        status = str(e.response.status_code)
+        raise
+    finally:
+        LLM_SECONDS.labels(model=model, mode="stream", status=status).observe(time.perf_counter() - start)
+        _record_usage(model, prompt, "".join(parts), usage)
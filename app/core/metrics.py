@@ -0,0 +1,46 @@
+import contextvars
+import time
+import uuid
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Per-request trace id, set by the tracing middleware and attached to logs/spans
+trace_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("trace_id", default=None)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+REQUEST_SECONDS = Histogram("chatpdf_request_seconds", "End-to-end QA request latency", ["endpoint"], buckets=_LATENCY_BUCKETS)
+NODE_SECONDS = Histogram("chatpdf_graph_node_seconds", "LangGraph node latency", ["node"], buckets=_LATENCY_BUCKETS)
+LLM_SECONDS = Histogram("chatpdf_llm_seconds", "OpenRouter request latency", ["model", "mode", "status"], buckets=_LATENCY_BUCKETS)
+LLM_FIRST_TOKEN_SECONDS = Histogram("chatpdf_llm_first_token_seconds", "Streaming time to first token", ["model"], buckets=_LATENCY_BUCKETS)
+LLM_RETRIES = Counter("chatpdf_llm_retries_total", "OpenRouter attempts retried", ["model", "reason"])
+LLM_COALESCED = Counter("chatpdf_llm_coalesced_total", "Completions served by an identical in-flight call", ["model"])
+LLM_TOKENS = Counter("chatpdf_llm_tokens_total", "Tokens reported by OpenRouter usage", ["model", "kind"])
+LLM_CHARS = Counter("chatpdf_llm_characters_total", "Prompt/completion characters", ["model", "kind"])
+EMBED_SECONDS = Histogram("chatpdf_embedding_seconds", "model.encode latency per call", ["source"], buckets=_FAST_BUCKETS + (2.5, 5, 10))
+EMBED_TEXTS = Histogram("chatpdf_embedding_batch_size", "Texts per model.encode call", ["source"], buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+RERANK_SECONDS = Histogram("chatpdf_rerank_seconds", "Cross-encoder predict latency per call", buckets=_FAST_BUCKETS + (2.5, 5, 10))
+RERANK_PAIRS = Counter("chatpdf_rerank_pairs_total", "Query/chunk pairs seen by the reranker", ["result"])
+CHROMA_SECONDS = Histogram("chatpdf_chroma_seconds", "Chroma operation latency", ["op"], buckets=_FAST_BUCKETS + (2.5, 5, 10))
+REDIS_SECONDS = Histogram("chatpdf_redis_seconds", "Redis round-trip latency", ["op"], buckets=_FAST_BUCKETS)
+ROUTER_DECISIONS = Counter("chatpdf_router_decisions_total", "Fast-path router outcomes", ["route"])
+CONTEXT_TOKENS = Counter("chatpdf_reader_context_tokens_total", "Estimated reader prompt tokens before/after packing", ["kind"])
+WEB_SEARCH_LOOKUPS = Counter("chatpdf_web_search_lookups_total", "Web search cache lookups", ["result"])
+WARMUP_SECONDS = Gauge("chatpdf_warmup_seconds", "Startup warm-up time per component", ["component"])
+ANSWER_CACHE_LOOKUPS = Counter("chatpdf_answer_cache_lookups_total", "Semantic answer cache lookups", ["result"])
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def timer(histogram, **labels):
+    """Observe the wall time of the block in ``histogram``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - start)
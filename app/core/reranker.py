@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from app.config import settings
+from app.core.metrics import RERANK_SECONDS, RERANK_PAIRS, timer
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+_lock = threading.Lock()
+_model = None
+_reranker = None
+
+
+def get_cross_encoder() -> "CrossEncoder":
+    global _model
+    with _lock:
+        if _model is None:
+            from sentence_transformers import CrossEncoder
+            _model = CrossEncoder(settings.rerank_model, max_length=settings.rerank_max_length, device="cpu")
+        return _model
+
+
+class Reranker:
+    """Re-score retrieval candidates with a local cross-encoder.
+
+    All uncached (query, chunk) pairs are scored in one batched ``predict`` call;
+    scores are kept in an in-process LRU keyed by query and chunk id, so
+    follow-ups and repeated questions only pay for new candidates.
+    """
+
+    def __init__(self, cache_size: int, batch_size: int):
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._cache: "OrderedDict[tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._predict_lock = threading.Lock()
+
+    def rerank(self, query: str, candidates: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        qkey = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        scores: Dict[str, float] = {}
+        missing = []
+        with self._cache_lock:
+            for doc in candidates:
+                score = self._cache.get((qkey, doc["id"]))
+                if score is None:
+                    missing.append(doc)
+                else:
+                    self._cache.move_to_end((qkey, doc["id"]))
+                    scores[doc["id"]] = score
+        RERANK_PAIRS.labels(result="hit").inc(len(candidates) - len(missing))
+        RERANK_PAIRS.labels(result="miss").inc(len(missing))
+        if missing:
+            model = get_cross_encoder()
+            pairs = [(query, doc["content"]) for doc in missing]
+            # torch already parallelises one batch across cores; overlapping calls just thrash
+            with self._predict_lock, timer(RERANK_SECONDS):
+                fresh = model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            with self._cache_lock:
+                for doc, score in zip(missing, fresh):
+                    scores[doc["id"]] = float(score)
+                    self._cache[(qkey, doc["id"])] = float(score)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        ranked = sorted(candidates, key=lambda doc: scores[doc["id"]], reverse=True)[:k]
+        return [{**doc, "rerank": scores[doc["id"]]} for doc in ranked]
+
+    async def arerank(self, query: str, candidates: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.rerank, query, candidates, k)
+
+
+def get_reranker() -> Reranker:
+    global _reranker
+    if _reranker is None:
+        with _lock:
+            if _reranker is None:
+                _reranker = Reranker(settings.rerank_cache_size, settings.rerank_batch_size)
+    return _reranker
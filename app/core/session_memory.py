@@ -1,18 +1,122 @@
-import redis
+import asyncio
 import json
+import logging
+from typing import Any, Dict, List
+import redis.asyncio as redis
 from app.config import settings
+from app.core.llm_client import llm_completion
+from app.core.metrics import REDIS_SECONDS, timer
+
+logger = logging.getLogger("session_memory")
+
+_pool: redis.ConnectionPool | None = None
+# Background compactions, referenced so they are not garbage-collected mid-flight
+_compactions: set = set()
+
+def get_redis() -> redis.Redis:
+    """Redis client backed by a process-wide connection pool."""
+    global _pool
+    if _pool is None:
+        _pool = redis.ConnectionPool.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            max_connections=settings.redis_max_connections,
+        )
+    return redis.Redis(connection_pool=_pool)
+
+async def close_redis():
+    global _pool
+    if _compactions:
+        await asyncio.gather(*_compactions, return_exceptions=True)
+    if _pool is not None:
+        await _pool.disconnect()
+        _pool = None
 
 class SessionMemory:
+    """Conversation turns for one session.
+
+    The newest ``session_window_turns`` turns are kept verbatim in a Redis list;
+    once the list outgrows the window, the oldest turns are folded into a rolling
+    LLM summary stored next to it. Both keys expire after ``session_ttl_seconds``
+    of inactivity.
+    """
+
     def __init__(self, session_id: str):
         self.session_id = session_id
-        self.redis = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+        self.summary_key = f"{session_id}:summary"
+        self.lock_key = f"{session_id}:compacting"
+        self.redis = get_redis()
 
-    def save_turn(self, question, answer, sources):
+    async def save_turn(self, question, answer, sources):
         turn = json.dumps({"question": question, "answer": answer, "sources": sources})
-        self.redis.rpush(self.session_id, turn)
+        ttl = settings.session_ttl_seconds
+        with timer(REDIS_SECONDS, op="session_save"):
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.rpush(self.session_id, turn)
+            pipe.expire(self.session_id, ttl)
+            pipe.expire(self.summary_key, ttl)
+            length, _, _ = await pipe.execute()
+        window = settings.session_window_turns
+        if length <= window:
+            return
+        if not settings.session_summary_enabled:
+            with timer(REDIS_SECONDS, op="session_trim"):
+                await self.redis.ltrim(self.session_id, -window, -1)
+            return
+        # Summarize off the request path; the next request sees the trimmed list
+        task = asyncio.create_task(self._compact())
+        _compactions.add(task)
+        task.add_done_callback(_compactions.discard)
+
+    async def load(self) -> Dict[str, Any]:
+        """Fetch the windowed turns and rolling summary in one round trip."""
+        with timer(REDIS_SECONDS, op="session_history"):
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.lrange(self.session_id, -settings.session_window_turns, -1)
+            pipe.get(self.summary_key)
+            raw, summary = await pipe.execute()
+        return {"turns": [json.loads(x) for x in raw], "summary": summary or ""}
+
+    async def history(self):
+        return (await self.load())["turns"]
+
+    async def clear(self):
+        with timer(REDIS_SECONDS, op="session_clear"):
+            await self.redis.delete(self.session_id, self.summary_key, self.lock_key)
 
-    def history(self):
-        return [json.loads(x) for x in self.redis.lrange(self.session_id, 0, -1)]
+    async def _compact(self):
+        # One compaction per session at a time; a concurrent save just skips it
+        if not await self.redis.set(self.lock_key, "1", nx=True, ex=60):
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.lrange(self.session_id, 0, -settings.session_window_turns - 1)
+            pipe.get(self.summary_key)
+            overflow, summary = await pipe.execute()
+            if not overflow:
+                return
+            turns = [json.loads(x) for x in overflow]
+            summary = await summarize_turns(summary or "", turns)
+            ttl = settings.session_ttl_seconds
+            # Only the turns that were summarized are dropped; newer appends survive
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(self.summary_key, summary, ex=ttl)
+            pipe.ltrim(self.session_id, len(overflow), -1)
+            await pipe.execute()
+        except Exception:
+            logger.exception("Session compaction failed for %s", self.session_id)
+        finally:
+            await self.redis.delete(self.lock_key)
 
-    def clear(self):
-        self.redis.delete(self.session_id)
+async def summarize_turns(summary: str, turns: List[Dict[str, Any]]) -> str:
+    limit = settings.session_summary_max_chars
+    turns_text = "\n".join(f"Q: {t.get('question')}\nA: {t.get('answer')}" for t in turns)
+    prompt = (
+        "You maintain a running summary of a conversation between a user and a PDF Q&A assistant.\n"
+        "Merge the new turns into the existing summary. Keep names, numbers, documents and open questions "
+        "the user may refer back to; drop pleasantries and repetition.\n"
+        f"Reply with the updated summary only, at most {limit} characters.\n\n"
+        f"Existing summary (may be empty):\n{summary}\n\n"
+        f"New turns:\n{turns_text}\n"
+    )
+    return (await llm_completion(prompt)).strip()[:limit]
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+from app.config import settings
+from app.core.metrics import WARMUP_SECONDS
+from app.core.session_memory import get_redis
+
+logger = logging.getLogger("startup")
+
+_components: Dict[str, Dict[str, Any]] = {}
+_task: asyncio.Task | None = None
+
+
+def _warm_embedder():
+    from app.core.embeddings import get_embedding_cache, get_model
+    # The first encode also initialises torch's kernels and thread pool
+    get_model().encode(["warm-up"])
+    get_embedding_cache()
+
+
+def _warm_vectorstore():
+    from app.core.lexical_index import get_lexical_index
+    from app.core.vectorstore import get_vectorstore
+    get_vectorstore()
+    get_lexical_index()
+
+
+def _warm_graph():
+    from app.api.qa import get_graph
+    get_graph()
+
+
+def _warm_reranker():
+    from app.core.reranker import get_cross_encoder
+    get_cross_encoder().predict([("warm-up", "warm-up")])
+
+
+def _steps():
+    steps = {"embedding_model": _warm_embedder, "vectorstore": _warm_vectorstore, "graph": _warm_graph}
+    if settings.rerank_enabled:
+        steps["reranker"] = _warm_reranker
+    return steps
+
+
+async def _warm(name, fn):
+    _components[name] = {"status": "warming"}
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(fn)
+    except Exception as e:
+        logger.exception("Warm-up of %s failed", name)
+        _components[name] = {"status": "error", "error": str(e)}
+        return
+    elapsed = time.perf_counter() - start
+    WARMUP_SECONDS.labels(component=name).set(elapsed)
+    _components[name] = {"status": "ready", "seconds": round(elapsed, 3)}
+    logger.info("Warmed %s in %.2fs", name, elapsed)
+
+
+async def warm_up():
+    """Load every heavy component concurrently, each on a worker thread."""
+    await asyncio.gather(*(_warm(name, fn) for name, fn in _steps().items()))
+
+
+def start_warm_up() -> asyncio.Task:
+    global _task
+    _components.update({name: {"status": "pending"} for name in _steps()})
+    _task = asyncio.create_task(warm_up())
+    return _task
+
+
+async def stop_warm_up():
+    """Wait for any warm-up still running so shutdown doesn't close a store it is opening."""
+    if _task is not None and not _task.done():
+        await asyncio.gather(_task, return_exceptions=True)
+
+
+async def readiness() -> Dict[str, Any]:
+    """Warm-up state of each component plus a live Redis ping; ready only if all pass."""
+    components = {name: dict(state) for name, state in _components.items()}
+    try:
+        await asyncio.wait_for(get_redis().ping(), settings.ready_redis_timeout_seconds)
+        components["redis"] = {"status": "ready"}
+    except Exception as e:
+        components["redis"] = {"status": "error", "error": str(e) or type(e).__name__}
+    return {
+        "ready": all(state["status"] == "ready" for state in components.values()),
+        "components": components,
+    }
@@ -1,46 +1,359 @@
-import chromadb
+import logging
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List
 from app.config import settings
+from app.core.metrics import CHROMA_SECONDS, timer
 
-def get_vectorstore():
-    client = chromadb.PersistentClient(path=settings.chroma_dir)
-    collection = client.get_or_create_collection("pdf_chunks")
-    return VectorStore(collection)
+COLLECTION_NAME = "pdf_chunks"
+# Also a valid Chroma collection-name suffix
+NAMESPACE_PATTERN = r"^[A-Za-z0-9_-]{1,40}$"
+
+logger = logging.getLogger("vectorstore")
+
+_lock = threading.Lock()
+_client = None
+_stores: Dict[str, "VectorStore"] = {}
+
+# Settings mapped onto Chroma's per-collection HNSW metadata keys
+_CHROMA_HNSW = {
+    "hnsw:space": "vector_metric",
+    "hnsw:M": "hnsw_m",
+    "hnsw:construction_ef": "hnsw_ef_construction",
+    "hnsw:search_ef": "hnsw_ef_search",
+    "hnsw:batch_size": "hnsw_batch_size",
+    "hnsw:sync_threshold": "hnsw_sync_threshold",
+}
+
+def collection_name(namespace: str | None = None) -> str:
+    """Collection holding ``namespace``: its own one when namespace_collections is on."""
+    if namespace and settings.namespace_collections:
+        return f"{COLLECTION_NAME}__{namespace}"
+    return COLLECTION_NAME
+
+def store_signature(namespace: str | None = None) -> str:
+    """Backend and location of the store holding ``namespace``, recorded in ingest manifests."""
+    directory = {"chroma": settings.chroma_dir, "hnsw": settings.hnsw_dir,
+                 "compact": settings.compact_store_dir}.get(settings.vector_backend, "")
+    return f"{settings.vector_backend}:{os.path.join(directory, collection_name(namespace))}"
+
+def get_vectorstore(namespace: str | None = None):
+    """Return the process-wide VectorStore, opening the Chroma client on first use."""
+    return _open(collection_name(namespace))
+
+def _open(name: str):
+    global _client
+    store = _stores.get(name)
+    if store is None:
+        with _lock:
+            store = _stores.get(name)
+            if store is None:
+                if settings.vector_backend == "compact":
+                    from app.core.compact_store import CompactVectorStore
+                    store = CompactVectorStore(os.path.join(settings.compact_store_dir, name), settings.compact_quantization,
+                                               settings.compact_rescore_factor, settings.compact_block_rows)
+                elif settings.vector_backend == "hnsw":
+                    from app.core.hnsw_store import HnswVectorStore
+                    store = HnswVectorStore(os.path.join(settings.hnsw_dir, name), settings.vector_metric,
+                                            settings.hnsw_m, settings.hnsw_ef_construction, settings.hnsw_ef_search,
+                                            settings.hnsw_num_threads or -1, settings.hnsw_persist_every)
+                elif settings.vector_backend == "chroma":
+                    if _client is None:
+                        import chromadb
+                        _client = chromadb.PersistentClient(path=settings.chroma_dir)
+                    store = ChromaVectorStore(_chroma_collection(name), getattr(_client, "max_batch_size", 5000), _client)
+                else:
+                    raise ValueError(f"Unknown vector_backend: {settings.vector_backend}")
+                _stores[name] = store
+    return store
+
+def chroma_hnsw_metadata() -> Dict[str, Any]:
+    """Collection metadata carrying the configured metric and HNSW parameters."""
+    metadata = {key: getattr(settings, field) for key, field in _CHROMA_HNSW.items()}
+    if settings.hnsw_num_threads:
+        metadata["hnsw:num_threads"] = settings.hnsw_num_threads
+    return metadata
+
+def _chroma_collection(name: str):
+    try:
+        collection = _client.get_collection(name)
+    except Exception:
+        # Only a new collection takes the configured parameters; Chroma fixes them at creation
+        return _client.get_or_create_collection(name, metadata=chroma_hnsw_metadata())
+    current = collection.metadata or {}
+    wanted = chroma_hnsw_metadata()
+    if current.get("hnsw:space", "l2") != wanted["hnsw:space"] or current.get("hnsw:M", 16) != wanted["hnsw:M"]:
+        logger.warning("Collection %s was built with %s; clear it to apply %s", name,
+                       {k: v for k, v in current.items() if k.startswith("hnsw:")} or "Chroma defaults", wanted)
+    return collection
+
+def distance_to_score(metric: str, distance: float) -> float:
+    """Similarity (cosine for unit vectors) from an HNSW distance: l2 is squared, cosine/ip are 1 - dot."""
+    return 1.0 - distance / 2.0 if metric == "l2" else 1.0 - distance
+
+def list_vectorstores() -> List["VectorStore"]:
+    """Every chunk collection on disk: the shared one plus any per-namespace ones."""
+    shared = get_vectorstore()
+    if settings.vector_backend in ("compact", "hnsw"):
+        directory = settings.compact_store_dir if settings.vector_backend == "compact" else settings.hnsw_dir
+        names = os.listdir(directory)
+    else:
+        names = [getattr(c, "name", c) for c in _client.list_collections()]
+    return [shared] + [_open(name) for name in sorted(names) if name.startswith(COLLECTION_NAME + "__")]
+
+def reset_vectorstore():
+    """Drop the cached collection handles so the next call reopens them."""
+    with _lock:
+        _stores.clear()
+
+def close_vectorstore():
+    global _client
+    with _lock:
+        for store in _stores.values():
+            store.close()
+        if _client is not None:
+            # Stops the shared Chroma system and releases the on-disk index
+            clear_cache = getattr(_client, "clear_system_cache", None)
+            if clear_cache is not None:
+                clear_cache()
+        _client = None
+        _stores.clear()
+
+def chunk_id(metadata):
+    """Stable chunk ID derived from its metadata."""
+    m = metadata
+    prefix = f"{m['namespace']}::" if m.get("namespace") else ""
+    return f"{prefix}{m.get('source','unknown')}::p{m.get('page','?')}::c{m.get('chunk','?')}"
+
+def build_where(doc_ids: List[str] | None = None, namespace: str | None = None) -> Dict[str, Any] | None:
+    """Chroma ``where`` clause restricting a query to documents and/or a namespace."""
+    clauses = []
+    if doc_ids:
+        clauses.append({"source": doc_ids[0]} if len(doc_ids) == 1 else {"source": {"$in": list(doc_ids)}})
+    # A dedicated collection already scopes the namespace
+    if namespace and not settings.namespace_collections:
+        clauses.append({"namespace": namespace})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+class RWLock:
+    """Many readers or one writer; a waiting writer holds back new readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writers_waiting = 0
+        self._writing = False
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
 
 class VectorStore:
-    def __init__(self, collection):
-        self.collection = collection
+    """Engine interface shared by the Chroma, HNSW and compact backends.
+
+    Backends implement ``_add_chunks``, ``similarity_search_batch``,
+    ``delete_ids``, ``delete_source`` and ``clear_all``; ``flush`` persists whatever the engine
+    buffers. Inside ``bulk_build()`` writes are buffered and handed to the
+    engine in ``vector_bulk_batch_size`` batches when the block exits.
+    """
+    metric = "l2"
+    bulk_batch_size = None
+    _bulk = None
 
-    def similarity_search(self, embedding, k=5):
-        # Ensure embedding is a plain Python list for Chroma
-        if hasattr(embedding, "tolist"):
-            embedding = embedding.tolist()
-        results = self.collection.query(
-            query_embeddings=[embedding],
-            n_results=k,
-            include=["documents", "metadatas"]
-        )
-        docs = []
-        for text, meta in zip(results['documents'][0], results['metadatas'][0]):
-            docs.append({"content": text, "metadata": meta})
-        return docs
+    def similarity_search(self, embedding, k=5, where=None):
+        return self.similarity_search_batch([embedding], k, where)[0]
+
+    def similarity_search_batch(self, embeddings, k=5, where=None):
+        raise NotImplementedError
 
     def add_chunks(self, contents, embeddings, metadatas):
+        if self._bulk is not None:
+            # Keyed by id: the last write wins, as with an upsert
+            self._bulk.update((chunk_id(m), item) for m, item in zip(metadatas, zip(contents, embeddings, metadatas)))
+            return
+        self._add_chunks(contents, embeddings, metadatas)
+
+    def _add_chunks(self, contents, embeddings, metadatas):
+        raise NotImplementedError
+
+    def delete_source(self, source, namespace=None, batch_size=1000, progress=None):
+        """Delete every chunk of one document; queries see it either whole or gone."""
+        raise NotImplementedError
+
+    @contextmanager
+    def bulk_build(self):
+        """Buffer add_chunks() for an initial load; queries don't see the rows until the block exits."""
+        self._bulk = {}
+        try:
+            yield self
+        finally:
+            pending, self._bulk = list(self._bulk.values()), None
+            size = min(settings.vector_bulk_batch_size, self.bulk_batch_size or settings.vector_bulk_batch_size)
+            for start in range(0, len(pending), size):
+                contents, embeddings, metadatas = zip(*pending[start:start + size])
+                self._add_chunks(list(contents), list(embeddings), list(metadatas))
+            self.flush()
+
+    def flush(self):
+        """Nothing buffered by default."""
+
+    def close(self):
+        self.flush()
+
+class ChromaVectorStore(VectorStore):
+    """Chroma collection handle.
+
+    Queries and writes hold the read side of ``_rw``; clear_all takes the
+    write side to swap in a fresh collection, so it waits for in-flight
+    queries and none of them ever reads a half-deleted index.
+    """
+
+    def __init__(self, collection, max_batch_size=5000, client=None):
+        self.collection = collection
+        self.metric = (collection.metadata or {}).get("hnsw:space", "l2")
+        self.bulk_batch_size = max_batch_size
+        self._client = client
+        self._rw = RWLock()
+        # Sources being deleted, hidden from queries until the last page is gone
+        self._hidden = Counter()
+        self._hidden_lock = threading.Lock()
+
+    def _visible(self, where):
+        with self._hidden_lock:
+            hidden = sorted(self._hidden)
+        if not hidden:
+            return where
+        # By source across namespaces: over-hides a same-named document elsewhere, only while deleting
+        clause = {"source": {"$nin": hidden}}
+        return {"$and": [where, clause]} if where else clause
+
+    def similarity_search_batch(self, embeddings, k=5, where=None):
+        """One Chroma query for several embeddings; returns a result list per embedding."""
+        # Ensure embeddings are plain Python lists for Chroma
+        embeddings = [e.tolist() if hasattr(e, "tolist") else e for e in embeddings]
+        if not embeddings:
+            return []
+        where = self._visible(where)
+        with self._rw.read(), timer(CHROMA_SECONDS, op="query_filtered" if where else "query"):
+            results = self.collection.query(
+                query_embeddings=embeddings,
+                n_results=k,
+                where=where,
+                include=["documents", "metadatas", "distances"]
+            )
+        batches = []
+        for ids, texts, metas, dists in zip(results['ids'], results['documents'], results['metadatas'], results['distances']):
+            batches.append([{"id": cid, "content": text, "metadata": meta, "score": distance_to_score(self.metric, dist)}
+                            for cid, text, meta, dist in zip(ids, texts, metas, dists)])
+        return batches
+
+    def _add_chunks(self, contents, embeddings, metadatas):
         # Generate stable IDs for each chunk using metadata
-        ids = [
-            f"{m.get('source','unknown')}::p{m.get('page','?')}::c{m.get('chunk','?')}"
-            for m in metadatas
-        ]
-        self.collection.upsert(
-            ids=ids,
-            documents=contents,
-            embeddings=embeddings,
-            metadatas=metadatas
-        )
-    
+        ids = [chunk_id(m) for m in metadatas]
+        with self._rw.read(), timer(CHROMA_SECONDS, op="upsert"):
+            self.collection.upsert(
+                ids=ids,
+                documents=contents,
+                embeddings=embeddings,
+                metadatas=metadatas
+            )
+
+    def flush(self):
+        """Chroma syncs its index itself (``hnsw:batch_size`` / ``hnsw:sync_threshold``)."""
+
+    def close(self):
+        """The shared client is closed by close_vectorstore()."""
+
+    def delete_ids(self, ids, batch_size=1000):
+        ids = list(ids)
+        for start in range(0, len(ids), batch_size):
+            with self._rw.read(), timer(CHROMA_SECONDS, op="delete"):
+                self.collection.delete(ids=ids[start:start + batch_size])
+        return len(ids)
+
+    def delete_source(self, source, namespace=None, batch_size=1000, progress=None):
+        """Hide ``source`` from queries, then delete its ids a page at a time (no documents fetched)."""
+        progress = progress or (lambda **counters: None)
+        with self._hidden_lock:
+            self._hidden[source] += 1
+        deleted = 0
+        try:
+            for ids in self._source_pages(source, namespace, batch_size):
+                with self._rw.read(), timer(CHROMA_SECONDS, op="delete"):
+                    self.collection.delete(ids=ids)
+                deleted += len(ids)
+                progress(chunks_deleted=deleted)
+        finally:
+            with self._hidden_lock:
+                self._hidden[source] -= 1
+                if not self._hidden[source]:
+                    del self._hidden[source]
+        return deleted
+
+    def _source_pages(self, source, namespace, batch_size):
+        """Pages of ids belonging to exactly one document of ``namespace``.
+
+        Unlike ``build_where`` this never widens to every namespace. Chroma
+        can't match a missing ``namespace`` key, so the default namespace's ids
+        are picked out of the source's metadata before any of them is deleted.
+        """
+        if namespace:
+            where = {"$and": [{"source": source}, {"namespace": namespace}]}
+            while True:
+                with self._rw.read():
+                    ids = self.collection.get(where=where, limit=batch_size, include=[])["ids"]
+                if not ids:
+                    return
+                yield ids
+        ids, offset = [], 0
+        while True:
+            with self._rw.read():
+                page = self.collection.get(where={"source": source}, limit=batch_size, offset=offset, include=["metadatas"])
+            if not page["ids"]:
+                break
+            ids.extend(cid for cid, meta in zip(page["ids"], page["metadatas"]) if not (meta or {}).get("namespace"))
+            offset += len(page["ids"])
+        for start in range(0, len(ids), batch_size):
+            yield ids[start:start + batch_size]
+
     def clear_all(self):
-        """Delete all chunks from the collection."""
-        # Get all IDs and delete them
-        results = self.collection.get()
-        if results['ids']:
-            self.collection.delete(ids=results['ids'])
-        return len(results['ids']) if results['ids'] else 0
+        """Drop and recreate the collection instead of deleting its rows."""
+        if self._client is None:
+            raise RuntimeError("clear_all needs the client that opened the collection")
+        with self._rw.write():
+            removed = self.collection.count()
+            name = self.collection.name
+            self._client.delete_collection(name)
+            # The new collection picks up the currently configured HNSW parameters
+            self.collection = self._client.create_collection(name, metadata=chroma_hnsw_metadata())
+            self.metric = self.collection.metadata["hnsw:space"]
+        return removed
@@ -1,50 +1,155 @@
+import asyncio
+import hashlib
+import json
 import logging
-import httpx
+import re
+from typing import Any, Dict, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from app.config import settings
+from app.core.http_client import get_http_client
+from app.core.metrics import REDIS_SECONDS, WEB_SEARCH_LOOKUPS, timer
+from app.core.session_memory import get_redis
 
-def search_web(query: str) -> str:
+logger = logging.getLogger("web_search")
+
+PREFIX = "web_search"
+
+# In-flight SearchAPI calls by cache key (singleflight within this process)
+_inflight: Dict[str, "asyncio.Task[List[Dict[str, str]]]"] = {}
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().strip("?!. ").lower()
+
+def normalize_url(url: str) -> str:
+    """Canonical form for de-duplication: no fragment, tracking params or trailing slash."""
+    parts = urlsplit(url.strip())
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower().removeprefix("www."), parts.path.rstrip("/"), query, ""))
+
+def _cache_key(query: str, tbs: str) -> str:
+    digest = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+    return f"{PREFIX}:{tbs or 'any'}:{digest}"
+
+def _parse(data: Dict[str, Any]) -> List[Dict[str, str]]:
+    items = []
+    # Prefer news_results if present and fresh
+    for r in data.get("news_results") or []:
+        items.append({
+            "title": r.get("title") or "(no title)",
+            "url": r.get("link") or r.get("url") or "",
+            "source": r.get("source") or "",
+            "date": r.get("date") or r.get("age") or "",
+            "snippet": r.get("snippet") or r.get("excerpt") or "",
+        })
+    # Fallback to organic_results
+    if not items:
+        for r in data.get("organic_results", []):
+            items.append({
+                "title": r.get("title") or "(no title)",
+                "url": r.get("link") or "",
+                "date": r.get("date") or "",
+                "snippet": r.get("snippet") or "",
+            })
+    return items
+
+def format_results(items: List[Dict[str, str]]) -> str:
+    """Compact digest: Title, URL, Source, Date, Snippet."""
+    if not items:
+        return "No relevant web search result found."
+    lines = []
+    for item in items:
+        source = f"\n  Source: {item['source']}" if "source" in item else ""
+        lines.append(f"- Title: {item['title']}\n  URL: {item['url']}{source}\n  Date: {item['date']}\n  Snippet: {item['snippet']}")
+    return "\n".join(lines)
+
+async def _fetch(query: str, tbs: str) -> List[Dict[str, str]]:
+    params = {
+        "api_key": settings.searchapi_api_key,
+        "engine": "google",
+        "q": query,
+        "num": settings.web_search_num,
+        "hl": "en",
+        "safe": "active",
+    }
+    if tbs:
+        params["tbs"] = tbs
+    client = await get_http_client()
+    resp = await client.get(settings.searchapi_url, params=params, timeout=settings.web_search_timeout_seconds)
+    resp.raise_for_status()
+    return _parse(resp.json())
+
+async def _cached_fetch(key: str, query: str, tbs: str) -> List[Dict[str, str]]:
+    redis = get_redis() if settings.web_search_cache_enabled else None
+    if redis is not None:
+        try:
+            with timer(REDIS_SECONDS, op="web_search_get"):
+                cached = await redis.get(key)
+            if cached is not None:
+                WEB_SEARCH_LOOKUPS.labels(result="hit").inc()
+                return json.loads(cached)
+        except Exception:
+            logger.warning("Web search cache read failed", exc_info=True)
+    WEB_SEARCH_LOOKUPS.labels(result="miss").inc()
+    items = await _fetch(query, tbs)
+    if redis is not None:
+        try:
+            with timer(REDIS_SECONDS, op="web_search_set"):
+                await redis.set(key, json.dumps(items), ex=settings.web_search_cache_ttl_seconds)
+        except Exception:
+            logger.warning("Web search cache write failed", exc_info=True)
+    return items
+
+async def search_web_items(query: str, tbs: str | None = None) -> List[Dict[str, str]]:
+    """Results for ``query`` from the shared Redis cache or SearchAPI.
+
+    Concurrent calls for the same normalized query and ``tbs`` window share
+    one lookup; errors propagate and are never cached.
+    """
+    tbs = settings.web_search_tbs if tbs is None else tbs
+    key = _cache_key(query, tbs)
+    task = _inflight.get(key)
+    if task is None:
+        task = _inflight[key] = asyncio.create_task(_cached_fetch(key, query, tbs))
+        task.add_done_callback(lambda t, key=key: _settle(key, t))
+    else:
+        WEB_SEARCH_LOOKUPS.labels(result="coalesced").inc()
+    return await asyncio.shield(task)
+
+def _settle(key, task):
+    _inflight.pop(key, None)
+    if not task.cancelled():
+        task.exception()  # mark retrieved even if every waiter went away
+
+def merge_items(result_lists: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    """Interleave per-query results (best of each first), dropping repeated URLs."""
+    seen, merged = set(), []
+    for rank in range(max((len(r) for r in result_lists), default=0)):
+        for items in result_lists:
+            if rank < len(items):
+                url = normalize_url(items[rank]["url"]) or items[rank]["title"]
+                if url not in seen:
+                    seen.add(url)
+                    merged.append(items[rank])
+    return merged
+
+async def search_web(query: str, extra_queries: List[str] | None = None, tbs: str | None = None) -> str:
     """Use SearchAPI.io (Google engine) to fetch fresh results.
 
-    - Restrict to last day using tbs=qdr:d
+    - Restrict to ``settings.web_search_tbs`` (last day by default)
+    - ``extra_queries`` (reformulations) are searched concurrently and merged by URL
     - Return compact digest: Title, URL, Snippet, Date if present
     """
-    try:
-        api_key = settings.searchapi_api_key
-        if not api_key:
-            return "Web search error: missing SEARCHAPI_API_KEY."
-        params = {
-            "api_key": api_key,
-            "engine": "google",
-            "q": query,
-            "num": 8,
-            "tbs": "qdr:d",  # last day
-            "hl": "en",
-            "safe": "active",
-        }
-        resp = httpx.get("https://www.searchapi.io/api/v1/search", params=params, timeout=20)
-        resp.raise_for_status()
-        data = resp.json()
-        items = []
-        # Prefer news_results if present and fresh
-        news = data.get("news_results") or []
-        for r in news:
-            title = r.get("title") or "(no title)"
-            href = r.get("link") or r.get("url") or ""
-            date = r.get("date") or r.get("age") or ""
-            snippet = r.get("snippet") or r.get("excerpt") or ""
-            source = r.get("source") or ""
-            items.append(f"- Title: {title}\n  URL: {href}\n  Source: {source}\n  Date: {date}\n  Snippet: {snippet}")
-        # Fallback to organic_results
-        if not items:
-            for r in data.get("organic_results", []):
-                title = r.get("title") or "(no title)"
-                href = r.get("link") or ""
-                snippet = r.get("snippet") or ""
-                date = r.get("date") or ""
-                items.append(f"- Title: {title}\n  URL: {href}\n  Date: {date}\n  Snippet: {snippet}")
-        if not items:
-            return "No relevant web search result found."
-        return "\n".join(items)
-    except Exception:
-        logging.exception("Web search failed")
+    if not settings.searchapi_api_key:
+        return "Web search error: missing SEARCHAPI_API_KEY."
+    queries = [query]
+    for extra in extra_queries or []:
+        if normalize_query(extra) not in {normalize_query(q) for q in queries}:
+            queries.append(extra)
+    results = await asyncio.gather(*(search_web_items(q, tbs) for q in queries), return_exceptions=True)
+    for q, r in zip(queries, results):
+        if isinstance(r, BaseException):
+            logger.error("Web search failed for %r", q, exc_info=r)
+    ok = [r for r in results if not isinstance(r, BaseException)]
+    if not ok:
         return "Web search error."
+    return format_results(merge_items(ok)[:settings.web_search_max_results])
@@ -0,0 +1,144 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from app.config import settings
+
+Page = Tuple[int, str]
+Chunk = Tuple[str, Dict[str, int]]
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[A-Z0-9])")
+
+
+def split_sentences(text: str) -> List[Tuple[str, bool]]:
+    """Return (sentence, starts_paragraph) pairs; PDF line wraps are joined."""
+    out = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = " ".join(paragraph.split())
+        for i, sentence in enumerate(_SENTENCE_RE.split(paragraph)):
+            if sentence:
+                out.append((sentence, i == 0))
+    return out
+
+
+def chunk_text(text, chunk_size=1000, overlap=200):
+    words = text.split()
+    chunks = []
+    i = 0
+    while i < len(words):
+        chunk = words[i:i+chunk_size]
+        chunks.append(" ".join(chunk))
+        i += chunk_size - overlap
+    return chunks
+
+
+class WordChunker:
+    """Legacy fixed word windows, one page at a time."""
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 200):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.signature = f"words:{chunk_size}:{overlap}"
+
+    def chunk_pages(self, pages: Iterable[Page]) -> Iterator[Chunk]:
+        for page_num, text in pages:
+            for idx, chunk in enumerate(chunk_text(text, self.chunk_size, self.overlap)):
+                yield chunk, {"page": page_num, "page_end": page_num, "chunk": idx + 1}
+
+
+class TokenChunker:
+    """Pack whole sentences into chunks measured in model tokens.
+
+    Sentences from a group of pages are tokenized in one batched call to the
+    model's fast tokenizer. Chunks break at sentence boundaries (preferring
+    paragraph starts once half full), carry up to ``overlap_tokens`` of
+    trailing sentences into the next chunk, and either stop at page ends or,
+    with ``span_pages``, continue across them recording ``page``..``page_end``.
+    Sentences longer than the budget are split on token offsets.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int, overlap_tokens: int, span_pages: bool = False, batch_pages: int = 16):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+        self.span_pages = span_pages
+        self.batch_pages = batch_pages
+        self.signature = f"tokens:{max_tokens}:{self.overlap_tokens}:{int(span_pages)}"
+
+    def _units(self, pages: List[Page]):
+        """Yield (page, text, n_tokens, starts_paragraph, last_on_page) for a page group."""
+        items = [(page_num, s, para) for page_num, text in pages for s, para in split_sentences(text)]
+        if not items:
+            return
+        enc = self.tokenizer([s for _, s, _ in items], add_special_tokens=False, return_offsets_mapping=True)
+        for i, ((page_num, sentence, para), ids, offsets) in enumerate(zip(items, enc["input_ids"], enc["offset_mapping"])):
+            last = i + 1 == len(items) or items[i + 1][0] != page_num
+            if len(ids) <= self.max_tokens:
+                yield page_num, sentence, len(ids), para, last
+                continue
+            pieces = range(0, len(ids), self.max_tokens)
+            for j, start in enumerate(pieces):
+                end = min(start + self.max_tokens, len(ids))
+                piece = sentence[offsets[start][0]:offsets[end - 1][1]]
+                yield page_num, piece, end - start, para and j == 0, last and j == len(pieces) - 1
+
+    def _page_groups(self, pages: Iterable[Page]):
+        group = []
+        for page in pages:
+            group.append(page)
+            if len(group) >= self.batch_pages:
+                yield group
+                group = []
+        if group:
+            yield group
+
+    def chunk_pages(self, pages: Iterable[Page]) -> Iterator[Chunk]:
+        counters: Dict[int, int] = {}
+        current: List[Tuple[int, str, int]] = []  # (page, sentence, tokens)
+        size = carried = 0
+
+        def emit():
+            start_page = current[0][0]
+            counters[start_page] = counters.get(start_page, 0) + 1
+            meta = {"page": start_page, "page_end": current[-1][0], "chunk": counters[start_page]}
+            return " ".join(s for _, s, _ in current), meta
+
+        def carry():
+            kept, total = [], 0
+            for unit in reversed(current):
+                if total + unit[2] > self.overlap_tokens:
+                    break
+                kept.insert(0, unit)
+                total += unit[2]
+            return kept, total
+
+        for group in self._page_groups(pages):
+            for page_num, sentence, n, para, last_on_page in self._units(group):
+                boundary = para and size >= self.max_tokens // 2
+                # Never emit a chunk made only of overlap carried from the previous one
+                if len(current) > carried and (size + n > self.max_tokens or boundary):
+                    yield emit()
+                    current, size = carry()
+                    if size + n > self.max_tokens:
+                        current, size = [], 0
+                    carried = len(current)
+                current.append((page_num, sentence, n))
+                size += n
+                if last_on_page and not self.span_pages:
+                    yield emit()
+                    current, size, carried = [], 0, 0
+        if len(current) > carried:
+            yield emit()
+
+
+def get_chunker():
+    """Build the chunker selected by ``settings.chunker``."""
+    if settings.chunker == "words":
+        return WordChunker(settings.chunk_size_words, settings.chunk_overlap_words)
+    if settings.chunker == "tokens":
+        from app.core.embeddings import get_model
+        model = get_model()
+        # Leave room for [CLS]/[SEP]; never exceed what the model actually reads
+        limit = min(settings.chunk_max_tokens, model.max_seq_length) - 2
+        return TokenChunker(model.tokenizer, limit, settings.chunk_overlap_tokens, settings.chunk_span_pages)
+    raise ValueError(f"Unknown chunker: {settings.chunker}")
@@ -0,0 +1,66 @@
+"""Page text extraction, kept import-light so spawned pool workers start fast."""
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+_pool = None
+_pool_workers = 0
+_lock = threading.Lock()
+
+
+def page_count(pdf_path):
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+
+def extract_range(pdf_path, start, end):
+    """Return [(page_number, text)] for 0-based pages [start, end)."""
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        return [(page_num + 1, doc[page_num].get_text()) for page_num in range(start, min(end, len(doc)))]
+
+
+def get_extract_pool(workers):
+    """Process pool shared across ingestions; None means extract in-process."""
+    global _pool, _pool_workers
+    if workers <= 1:
+        return None
+    with _lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: ingestion runs on worker threads, where forking is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def close_extract_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def iter_pages(pdf_path, pool=None, pages_per_task=8, max_in_flight=4):
+    """Yield (page_number, text) in order, extracting page ranges in parallel.
+
+    At most ``max_in_flight`` ranges are pending at once, so memory stays bounded
+    regardless of document size.
+    """
+    total = page_count(pdf_path)
+    ranges = iter(range(0, total, pages_per_task))
+    if pool is None:
+        for start in ranges:
+            yield from extract_range(pdf_path, start, start + pages_per_task)
+        return
+    pending = deque()
+    for start in ranges:
+        pending.append(pool.submit(extract_range, pdf_path, start, start + pages_per_task))
+        if len(pending) >= max_in_flight:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
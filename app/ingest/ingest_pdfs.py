@@ -1,62 +1,200 @@
 import argparse
+import asyncio
+import logging
 import os
-import fitz
-from app.core.embeddings import get_model
-from app.core.vectorstore import get_vectorstore
-
-def chunk_text(text, chunk_size=1000, overlap=200):
-    words = text.split()
-    chunks = []
-    i = 0
-    while i < len(words):
-        chunk = words[i:i+chunk_size]
-        chunks.append(" ".join(chunk))
-        i += chunk_size - overlap
-    return chunks
-
-def ingest_single(pdf_path, doc_id, embedder, vs):
-    doc = fitz.open(pdf_path)
-    all_chunks = []
-    for page_num in range(len(doc)):
-        text = doc[page_num].get_text()
-        page_chunks = chunk_text(text)
-        for idx, chunk in enumerate(page_chunks):
-            all_chunks.append({
-                "content": chunk,
-                "metadata": {"source": doc_id, "page": page_num+1, "chunk": idx+1}
-            })
-    contents = [c["content"] for c in all_chunks]
-    metadatas = [c["metadata"] for c in all_chunks]
-    if not contents:
-        print(f"No text extracted from {pdf_path}; skipping.")
+import re
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from app.core.documents import document_key, file_version
+from app.core.embeddings import MODEL_NAME, get_embedder, flush_embedding_cache
+from app.core.vectorstore import NAMESPACE_PATTERN, chunk_id, get_vectorstore, store_signature
+from app.core.lexical_index import get_lexical_index
+from app.config import settings
+from app.ingest.extract import get_extract_pool, iter_pages, page_count
+from app.ingest.manifest import delete_manifest, load_manifest, save_manifest, text_hash
+from app.ingest.chunking import chunk_text, get_chunker
+
+logger = logging.getLogger("ingest")
+
+def iter_chunks(pages, doc_id, chunker, namespace=None):
+    """Turn a stream of (page_number, text) into chunk records."""
+    scope = {"namespace": namespace} if namespace else {}
+    for content, meta in chunker.chunk_pages(pages):
+        yield content, {"source": doc_id, **scope, **meta}
+
+def ingest_single(pdf_path, doc_id, embedder, vs, progress=None, pool=None, force=False, namespace=None,
+                  save=save_manifest):
+    """Stream pages -> fixed-size embedding batches -> incremental upserts.
+
+    Page extraction runs on ``pool`` (if given), embedding on this thread, and
+    each upsert overlaps with embedding the next batch. Only a bounded number
+    of pages and one batch are held in memory at a time.
+
+    Re-ingestion is incremental: an unchanged file is skipped outright, only
+    chunks whose text hash changed since the last manifest are re-embedded,
+    and chunk ids that no longer exist are deleted. The new manifest is
+    handed to ``save`` once the document's vectors have been written.
+    """
+    progress = progress or (lambda **counters: None)
+    chunker = get_chunker()
+    file_hash = file_version(pdf_path)
+    key = document_key(doc_id, namespace)
+    previous = None if force else load_manifest(key)
+    if previous and previous.get("model") != MODEL_NAME:
+        previous = None  # vectors from another model can't be reused
+    store = store_signature(namespace)
+    if previous and previous.get("store") != store:
+        # Vectors went to another backend or collection: re-embed every chunk, still drop stale ids
+        previous = {"chunks": dict.fromkeys(previous["chunks"])}
+    if previous and previous.get("chunker") != chunker.signature:
+        previous["file_hash"] = None  # same file, new chunking: re-chunk, reuse matching chunks
+    if previous and not get_lexical_index().has_source(doc_id, namespace):
+        previous = None  # ingested before the lexical index existed; rebuild both
+    if previous and previous.get("file_hash") == file_hash:
+        unchanged = len(previous["chunks"])
+        progress(pages_total=len(previous["pages"]), pages_parsed=len(previous["pages"]), chunks_unchanged=unchanged)
+        logger.info("%s is unchanged; skipping.", key)
+        return unchanged
+    old_chunks = previous["chunks"] if previous else {}
+    manifest = {"doc_id": key, "file_hash": file_hash, "model": MODEL_NAME, "chunker": chunker.signature,
+                "store": store, "pages": {}, "chunks": {}}
+    progress(pages_total=page_count(pdf_path))
+    parsed = 0
+
+    def pages():
+        nonlocal parsed
+        for page_num, text in iter_pages(pdf_path, pool, settings.ingest_pages_per_task, settings.ingest_max_in_flight):
+            manifest["pages"][str(page_num)] = text_hash(text)
+            yield page_num, text
+            parsed += 1
+            progress(pages_parsed=parsed)
+
+    def changed_chunks():
+        nonlocal unchanged
+        for content, meta in iter_chunks(pages(), doc_id, chunker, namespace):
+            cid, digest = chunk_id(meta), text_hash(content)
+            manifest["chunks"][cid] = digest
+            if old_chunks.get(cid) == digest:
+                unchanged += 1
+                continue
+            yield content, meta
+
+    batch_size = settings.ingest_embed_batch_size
+    embedded = upserted = unchanged = 0
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="upsert") as upserter:
+        pending = None
+        for batch in _batched(changed_chunks(), batch_size):
+            contents = [c for c, _ in batch]
+            metadatas = [m for _, m in batch]
+            embeddings = embedder.encode(contents)
+            embedded += len(contents)
+            progress(chunks_embedded=embedded, chunks_unchanged=unchanged)
+            # Keep at most one upsert in flight
+            if pending is not None:
+                upserted += pending.result()
+                progress(chunks_upserted=upserted)
+            # Convert each embedding to a plain Python list
+            embeddings_list = [emb.tolist() for emb in embeddings]
+            pending = upserter.submit(_upsert, vs, contents, embeddings_list, metadatas)
+        if pending is not None:
+            upserted += pending.result()
+            progress(chunks_upserted=upserted)
+    progress(chunks_unchanged=unchanged)
+    stale = set(old_chunks) - set(manifest["chunks"])
+    if stale:
+        vs.delete_ids(sorted(stale))
+        get_lexical_index().delete(sorted(stale))
+        progress(chunks_deleted=len(stale))
+    save(manifest)
+    total = len(manifest["chunks"])
+    if not total:
+        logger.warning("No text extracted from %s; skipping.", pdf_path)
         return 0
-    embeddings = embedder.encode(contents, show_progress_bar=True)
-    # Convert each embedding to a plain Python list
-    embeddings_list = [emb.tolist() for emb in embeddings]
-    vs.add_chunks(contents, embeddings_list, metadatas)
-    print(f"Inserted {len(contents)} chunks for {doc_id}")
+    logger.info("Upserted %d chunks for %s (%d unchanged, %d deleted)", upserted, key, unchanged, len(stale))
+    return total
+
+def _upsert(vs, contents, embeddings, metadatas):
+    vs.add_chunks(contents, embeddings, metadatas)
+    get_lexical_index().upsert([chunk_id(m) for m in metadatas], contents, metadatas)
     return len(contents)
 
-def ingest(path, doc_id=None):
-    embedder = get_model()
-    vs = get_vectorstore()
-    total = 0
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def pdf_targets(path, doc_id=None):
+    """Yield (pdf_path, doc_id) for a PDF file or every PDF in a directory."""
     if os.path.isdir(path):
         for name in sorted(os.listdir(path)):
             if not name.lower().endswith('.pdf'):
                 continue
-            pdf_path = os.path.join(path, name)
-            file_doc_id = os.path.splitext(name)[0]
-            total += ingest_single(pdf_path, file_doc_id, embedder, vs)
-        print(f"Inserted total {total} chunks across PDFs in {path}")
+            yield os.path.join(path, name), os.path.splitext(name)[0]
     else:
-        file_doc_id = doc_id or os.path.splitext(os.path.basename(path))[0]
-        total += ingest_single(path, file_doc_id, embedder, vs)
+        yield path, doc_id or os.path.splitext(os.path.basename(path))[0]
+
+def ingest(path, doc_id=None, progress=None, workers=None, force=False, namespace=None, bulk=False):
+    """Ingest a PDF or a directory of PDFs.
+
+    ``bulk`` is meant for an initial load: vectors are buffered in memory and
+    written to the engine in large batches at the end (one multi-threaded
+    build for the HNSW backend) instead of one upsert per embedding batch.
+    """
+    embedder = get_embedder()
+    vs = get_vectorstore(namespace)
+    pool = get_extract_pool(settings.ingest_extract_workers if workers is None else workers)
+    total = 0
+    # A bulk build only writes vectors when the block exits, so its manifests wait until then
+    manifests = []
+    save = manifests.append if bulk else save_manifest
+    with vs.bulk_build() if bulk else nullcontext():
+        for pdf_path, file_doc_id in pdf_targets(path, doc_id):
+            total += ingest_single(pdf_path, file_doc_id, embedder, vs, progress, pool, force, namespace, save)
+    vs.flush()
+    for manifest in manifests:
+        save_manifest(manifest)
+    flush_embedding_cache()
+    if os.path.isdir(path):
+        logger.info("Inserted total %d chunks across PDFs in %s", total, path)
     return total
 
+def delete_document(doc_id, namespace=None, progress=None):
+    """Remove one document's manifest, lexical postings and vectors (paged, for large documents)."""
+    # Manifest first: if this is interrupted, the next upload re-ingests from scratch
+    delete_manifest(document_key(doc_id, namespace))
+    get_lexical_index().delete_source(doc_id, namespace)
+    return get_vectorstore(namespace).delete_source(doc_id, namespace, settings.delete_batch_size, progress)
+
+async def _record_versions(path, doc_id=None, namespace=None):
+    """Record the ingested file versions so the answer cache drops stale entries; best effort offline."""
+    from redis.exceptions import RedisError
+    from app.core.documents import file_version, set_document_version
+    from app.core.session_memory import close_redis
+    try:
+        for pdf_path, file_doc_id in pdf_targets(path, doc_id):
+            await set_document_version(document_key(file_doc_id, namespace), file_version(pdf_path))
+    except (RedisError, OSError) as e:
+        logger.warning("Redis unavailable (%s); answer-cache document versions were not recorded. "
+                       "Cached answers may be stale until the next upload or cache expiry.", e)
+    finally:
+        await close_redis()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("pdf_path", help="Path to a PDF file or a directory of PDFs")
     parser.add_argument("--doc-id", required=False, help="ID for this document (defaults to filename if omitted)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for page extraction (default: INGEST_EXTRACT_WORKERS; 1 = in-process)")
+    parser.add_argument("--namespace", default=None, help="Tenant/namespace to ingest into (default: the shared, unscoped corpus)")
+    parser.add_argument("--force", action="store_true", help="Re-embed every chunk even if the manifest says it is unchanged")
+    parser.add_argument("--bulk", action="store_true", help="Initial load: buffer vectors and build the index in large batches at the end")
     args = parser.parse_args()
-    ingest(args.pdf_path, args.doc_id)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.namespace and not re.match(NAMESPACE_PATTERN, args.namespace):
+        parser.error(f"--namespace must match {NAMESPACE_PATTERN}")
+    ingest(args.pdf_path, args.doc_id, workers=args.workers, force=args.force, namespace=args.namespace, bulk=args.bulk)
+    asyncio.run(_record_versions(args.pdf_path, args.doc_id, args.namespace))
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from app.config import settings
+
+logger = logging.getLogger("ingest_jobs")
+
+
+class IngestJobQueue:
+    """Runs PDF ingestion on a bounded worker pool and tracks per-file progress.
+
+    Jobs are kept in memory (most recent ``history`` jobs), so progress is
+    visible to the process that accepted the upload.
+    """
+
+    def __init__(self, max_workers: int, history: int = 100):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._history = history
+
+    def submit(self, files: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Queue ``files`` (dicts with filename, path, doc_id and optional namespace) and return the job snapshot."""
+        loop = asyncio.get_running_loop()
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "kind": "ingest",
+            "status": "queued",
+            "created": time.time(),
+            "finished": None,
+            "results": [
+                {
+                    "filename": f["filename"],
+                    "doc_id": f["doc_id"],
+                    "namespace": f.get("namespace"),
+                    "status": "queued",
+                    "pages_total": 0,
+                    "pages_parsed": 0,
+                    "chunks_embedded": 0,
+                    "chunks_upserted": 0,
+                    "chunks_unchanged": 0,
+                    "chunks_deleted": 0,
+                    "chunks_ingested": 0,
+                    "message": "",
+                }
+                for f in files
+            ],
+        }
+        self._add(job)
+        self._pool.submit(self._run, job, files, loop)
+        return self.get(job_id)
+
+    def submit_delete(self, targets: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Queue deletion of documents (dicts with doc_id and optional namespace) and return the job snapshot."""
+        loop = asyncio.get_running_loop()
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "kind": "delete",
+            "status": "queued",
+            "created": time.time(),
+            "finished": None,
+            "results": [
+                {
+                    "doc_id": t["doc_id"],
+                    "namespace": t.get("namespace"),
+                    "status": "queued",
+                    "chunks_deleted": 0,
+                    "message": "",
+                }
+                for t in targets
+            ],
+        }
+        self._add(job)
+        self._pool.submit(self._run_delete, job, targets, loop)
+        return self.get(job_id)
+
+    def _add(self, job):
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+            while len(self._jobs) > self._history:
+                self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return _snapshot(job) if job else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [_snapshot(job) for job in reversed(self._jobs.values())]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job, files, loop):
+        from app.core.documents import document_key, file_version, set_document_version
+        from app.ingest.ingest_pdfs import ingest
+
+        self._update(job, status="running")
+        for result, f in zip(job["results"], files):
+            def progress(**counters):
+                self._update(result, **counters)
+
+            self._update(result, status="running")
+            try:
+                chunks = ingest(f["path"], doc_id=f["doc_id"], progress=progress, namespace=f.get("namespace"))
+                # New document version invalidates cached answers
+                key = document_key(f["doc_id"], f.get("namespace"))
+                asyncio.run_coroutine_threadsafe(
+                    set_document_version(key, file_version(f["path"])), loop
+                ).result()
+                self._update(result, status="success", chunks_ingested=chunks,
+                             message=f"Successfully ingested {chunks} chunks")
+            except Exception as e:
+                logger.exception("Ingestion error")
+                # Clean up uploaded file if ingestion fails
+                if os.path.exists(f["path"]):
+                    os.remove(f["path"])
+                self._update(result, status="error", message=f"Failed to ingest: {str(e)}")
+        self._update(job, status="completed", finished=time.time())
+
+    def _run_delete(self, job, targets, loop):
+        from app.core.documents import document_key, remove_document
+        from app.ingest.ingest_pdfs import delete_document
+
+        self._update(job, status="running")
+        for result, t in zip(job["results"], targets):
+            def progress(**counters):
+                self._update(result, **counters)
+
+            self._update(result, status="running")
+            try:
+                deleted = delete_document(t["doc_id"], t.get("namespace"), progress)
+                asyncio.run_coroutine_threadsafe(
+                    remove_document(document_key(t["doc_id"], t.get("namespace"))), loop
+                ).result()
+                self._update(result, status="success", chunks_deleted=deleted,
+                             message=f"Deleted {deleted} chunks")
+            except Exception as e:
+                logger.exception("Deletion error")
+                self._update(result, status="error", message=f"Failed to delete: {str(e)}")
+        self._update(job, status="completed", finished=time.time())
+
+    def _update(self, target: Dict[str, Any], **fields):
+        with self._lock:
+            target.update(fields)
+
+
+def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+    results = [dict(r) for r in job["results"]]
+    success_count = sum(1 for r in results if r["status"] == "success")
+    error_count = sum(1 for r in results if r["status"] == "error")
+    return {
+        **{k: v for k, v in job.items() if k != "results"},
+        "results": results,
+        "summary": {
+            "total_files": len(results),
+            "successful": success_count,
+            "failed": error_count,
+            "total_chunks_ingested": sum(r.get("chunks_ingested", 0) for r in results),
+            "total_chunks_deleted": sum(r["chunks_deleted"] for r in results),
+        },
+    }
+
+
+_queue: IngestJobQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> IngestJobQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = IngestJobQueue(settings.ingest_workers, settings.ingest_job_history)
+        return _queue
+
+
+def close_job_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.shutdown()
+        _queue = None
@@ -0,0 +1,37 @@
+import hashlib
+import json
+import os
+import shutil
+from app.config import settings
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def _path(doc_id: str) -> str:
+    safe = hashlib.sha1(doc_id.encode("utf-8")).hexdigest()
+    return os.path.join(settings.manifest_dir, f"{safe}.json")
+
+def load_manifest(doc_id: str) -> dict | None:
+    """Per-document record of file, page and chunk hashes from the last ingest."""
+    try:
+        with open(_path(doc_id)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def save_manifest(manifest: dict):
+    os.makedirs(settings.manifest_dir, exist_ok=True)
+    path = _path(manifest["doc_id"])
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+def delete_manifest(doc_id: str):
+    try:
+        os.remove(_path(doc_id))
+    except FileNotFoundError:
+        pass
+
+def clear_manifests():
+    shutil.rmtree(settings.manifest_dir, ignore_errors=True)
@@ -1,9 +1,42 @@
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from starlette.middleware.base import BaseHTTPMiddleware
 from app.api import qa, memory, upload
+from app.core.http_client import close_http_client
+from app.core.session_memory import close_redis
+from app.core.vectorstore import close_vectorstore
+from app.core.startup import readiness, start_warm_up, stop_warm_up
+from app.ingest.jobs import close_job_queue
+from app.ingest.extract import close_extract_pool
+from app.core.embeddings import flush_embedding_cache
+from app.core.lexical_index import close_lexical_index
+from app.core.metrics import new_trace_id, trace_id_var
+from app.config import settings
 
-app = FastAPI(title="Chat With PDF Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the model, vector store and graph up front so the first request doesn't pay for them
+    if settings.warmup_enabled:
+        warm_up = start_warm_up()
+        if settings.warmup_blocking:
+            await warm_up
+    yield
+    await stop_warm_up()
+    # Release pooled connections on shutdown
+    close_job_queue()
+    close_extract_pool()
+    flush_embedding_cache()
+    # close_redis drains pending session-summary compactions, which call the LLM: keep the HTTP client open until then
+    await close_redis()
+    await close_http_client()
+    await asyncio.to_thread(close_vectorstore)
+    close_lexical_index()
+
+app = FastAPI(title="Chat With PDF Backend", lifespan=lifespan)
 
 app.include_router(qa.router, prefix="/v1")
 app.include_router(memory.router, prefix="/v1")
@@ -11,8 +44,32 @@ app.include_router(upload.router, prefix="/v1")
 
 @app.get("/health")
 def health():
+    """Liveness: the process is up, even while it is still warming up."""
     return {"status": "ok"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness: 503 until every component is warmed and Redis answers."""
+    status = await readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+# Middleware to tag every request with a trace id (honouring an incoming X-Trace-Id)
+class TraceMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        trace_id = request.headers.get("x-trace-id") or new_trace_id()
+        token = trace_id_var.set(trace_id)
+        try:
+            response = await call_next(request)
+        finally:
+            trace_id_var.reset(token)
+        if settings.trace_id_header:
+            response.headers["X-Trace-Id"] = trace_id
+        return response
+
 # Middleware to disable caching for static files
 class NoCacheMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
@@ -24,6 +81,7 @@ class NoCacheMiddleware(BaseHTTPMiddleware):
         return response
 
 app.add_middleware(NoCacheMiddleware)
+app.add_middleware(TraceMiddleware)
 
 # Serve static UI
 app.mount("/", StaticFiles(directory="app/ui", html=True), name="ui")
\ No newline at end of file
@@ -182,6 +182,27 @@ clearBtn.addEventListener('click', clearMemory);
 clearVectorstoreBtn.addEventListener('click', clearVectorstore);
 newChatBtn.addEventListener('click', () => { const id = uuid(); setSessionId(id); upsertChatTitle(id, 'New chat'); chatEl.innerHTML=''; });
 
+// Poll a background ingestion job until it completes, showing per-file progress
+async function waitForIngestJob(jobId, rejected) {
+  while (true) {
+    const resp = await fetch(`/v1/ingest_jobs/${jobId}`);
+    if (!resp.ok) throw new Error(await resp.text());
+    const job = await resp.json();
+    if (job.status === 'completed') {
+      const results = job.results.concat(rejected || []);
+      const failed = results.filter(r => r.status === 'error').length;
+      return { results, summary: { ...job.summary, total_files: results.length, failed } };
+    }
+    const current = job.results.find(r => r.status === 'running');
+    if (current) {
+      uploadStatusEl.textContent = `Ingesting ${current.filename}: ${current.pages_parsed}/${current.pages_total} pages, ${current.chunks_upserted} chunks`;
+    } else {
+      uploadStatusEl.textContent = 'Queued for ingestion...';
+    }
+    await new Promise(r => setTimeout(r, 1000));
+  }
+}
+
 // PDF upload handler
 pdfUploadEl.addEventListener('change', async (e) => {
   const files = Array.from(e.target.files);
@@ -204,7 +225,12 @@ pdfUploadEl.addEventListener('change', async (e) => {
       throw new Error(text);
     }
     
-    const data = await resp.json();
+    let data = await resp.json();
+    if (!data.job_id) {
+      data = { results: data.rejected, summary: { total_files: data.rejected.length, successful: 0, failed: data.rejected.length, total_chunks_ingested: 0 } };
+    } else {
+      data = await waitForIngestJob(data.job_id, data.rejected);
+    }
     const summary = data.summary;
     
     if (summary.successful === files.length) {
@@ -0,0 +1,91 @@
+"""HNSW parameter sweep: recall@k vs query latency for the in-process hnswlib
+engine and Chroma, on synthetic clustered embeddings.
+
+    python -m benchmarks.bench_ann_sweep --n 100000 --m 8 16 32 --ef-construction 64 200 \
+        --ef-search 10 32 64 128 256
+
+The in-process index is built once per (M, ef_construction) and re-queried at
+every ef_search. Chroma fixes search_ef when a collection is created, so each
+Chroma point is a separate build (``--engines hnsw`` skips them). Recall is
+measured against exact float32 brute force; ``--bulk`` loads through
+``bulk_build()`` instead of 5000-row upserts.
+"""
+import argparse
+import os
+import tempfile
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+from benchmarks.bench_compact_store import dir_bytes, evaluate, load, synthetic
+
+
+def build(vs, vecs, bulk):
+    start = time.perf_counter()
+    with vs.bulk_build() if bulk else nullcontext():
+        load(vs, vecs)
+    vs.flush()
+    return time.perf_counter() - start
+
+
+def main(args):
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+    import chromadb
+    from app.core.hnsw_store import HnswVectorStore
+    from app.core.vectorstore import ChromaVectorStore
+
+    rng = np.random.default_rng(0)
+    vecs, centers = synthetic(rng, args.n, args.dim)
+    queries = centers[rng.integers(0, len(centers), args.queries)] + 0.6 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    start = time.perf_counter()
+    truth = np.argsort(-(queries @ vecs.T), axis=1)[:, :args.k]
+    exact_ms = (time.perf_counter() - start) / args.queries * 1000
+
+    print(f"{args.n} vectors, dim {args.dim}, metric {args.metric}; exact brute force {exact_ms:.2f} ms/query")
+    print(f"{'engine':>7} {'M':>4} {'ef_c':>5} {'ef_s':>5} {'build s':>8} {'disk MB':>8} "
+          f"{'recall@' + str(args.k):>9} {'p50 ms':>8} {'p99 ms':>8}")
+
+    def report(engine, m, efc, ef, build_s, directory, vs):
+        recall, p50, p99 = evaluate(vs, queries, truth, args.k)
+        print(f"{engine:>7} {m:>4} {efc:>5} {ef:>5} {build_s:>8.1f} {dir_bytes(directory) / 1e6:>8.1f} "
+              f"{recall:>9.3f} {p50:>8.2f} {p99:>8.2f}", flush=True)
+
+    for m in args.m:
+        for efc in args.ef_construction:
+            if "hnsw" in args.engines:
+                directory = tempfile.mkdtemp(prefix="bench-hnsw-")
+                vs = HnswVectorStore(directory, args.metric, m, efc, max(args.ef_search), persist_every=0)
+                build_s = build(vs, vecs, args.bulk)
+                for ef in args.ef_search:
+                    vs.set_ef_search(ef)
+                    report("hnsw", m, efc, ef, build_s, directory, vs)
+                vs.close()
+            if "chroma" in args.engines and args.n <= args.chroma_max:
+                for ef in args.ef_search:
+                    directory = tempfile.mkdtemp(prefix="bench-chroma-")
+                    client = chromadb.PersistentClient(path=directory)
+                    collection = client.create_collection("bench", metadata={
+                        "hnsw:space": args.metric, "hnsw:M": m, "hnsw:construction_ef": efc, "hnsw:search_ef": ef,
+                    })
+                    vs = ChromaVectorStore(collection, getattr(client, "max_batch_size", 5000))
+                    build_s = build(vs, vecs, args.bulk)
+                    report("chroma", m, efc, ef, build_s, directory, vs)
+                    client.clear_system_cache()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--metric", default="cosine", choices=["l2", "cosine", "ip"])
+    parser.add_argument("--engines", nargs="+", default=["hnsw", "chroma"], choices=["hnsw", "chroma"])
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[64, 200])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 32, 64, 128, 256])
+    parser.add_argument("--chroma-max", type=int, default=100_000)
+    parser.add_argument("--bulk", action="store_true")
+    parser.add_argument("-k", type=int, default=10)
+    main(parser.parse_args())
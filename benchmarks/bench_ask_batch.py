@@ -0,0 +1,74 @@
+"""Questions per second: looping /v1/ask vs one /v1/ask_batch call, against
+local stub servers. Retrieval-only mode isolates the batched encode/query path.
+
+Requires a reachable Redis (REDIS_URL, default redis://localhost:6379/0) for /v1/ask.
+
+    python -m benchmarks.bench_ask_batch --questions 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from benchmarks.stubs import StubServer, make_llm_app, make_search_app
+
+
+async def loop_ask(client, questions, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(question):
+        async with sem:
+            resp = await client.post("/v1/ask", json={"session_id": f"bench-{uuid.uuid4()}", "question": question})
+            resp.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    return time.perf_counter() - start
+
+
+async def batch_ask(client, questions, retrieve_only):
+    start = time.perf_counter()
+    resp = await client.post("/v1/ask_batch", json={"questions": questions, "retrieve_only": retrieve_only})
+    resp.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def main(args):
+    import httpx
+    from app.main import app
+    from app.core.http_client import close_http_client
+    from app.core.session_memory import close_redis
+
+    questions = [f"What does section {i} say about retrieval latency?" for i in range(args.questions)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        await batch_ask(client, questions[:2], True)  # warm up model and collection
+        print(f"{'mode':>22} {'seconds':>10} {'questions/s':>12}")
+        for name, run in (
+            (f"/ask x{args.concurrency}", loop_ask(client, questions, args.concurrency)),
+            ("/ask_batch", batch_ask(client, questions, False)),
+            ("/ask_batch retrieve", batch_ask(client, questions, True)),
+        ):
+            elapsed = await run
+            print(f"{name:>22} {elapsed:>10.2f} {len(questions) / elapsed:>12.1f}")
+    await close_redis()
+    await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent /v1/ask calls (and ASK_BATCH_CONCURRENCY)")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with StubServer(make_llm_app(args.llm_latency)) as llm, StubServer(make_search_app(0.1)) as search:
+        os.environ["OPENROUTER_API_KEY"] = "stub"
+        os.environ["OPENROUTER_API_URL"] = f"{llm.url}/api/v1/chat/completions"
+        os.environ["SEARCHAPI_API_KEY"] = "stub"
+        os.environ["SEARCHAPI_URL"] = f"{search.url}/api/v1/search"
+        os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+        os.environ["ASK_BATCH_CONCURRENCY"] = str(args.concurrency)
+        asyncio.run(main(args))
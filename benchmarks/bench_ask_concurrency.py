@@ -0,0 +1,60 @@
+"""Throughput of /v1/ask under concurrent load against local stub servers.
+
+Requires a reachable Redis (REDIS_URL, default redis://localhost:6379/0).
+
+    python -m benchmarks.bench_ask_concurrency --requests 64 --concurrency 1 8 32 64
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from benchmarks.stubs import StubServer, make_llm_app, make_search_app
+
+
+async def run_level(client, total: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            resp = await client.post("/v1/ask", json={"session_id": f"bench-{uuid.uuid4()}", "question": f"question {i}"})
+            resp.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+async def main(args):
+    import httpx
+    from app.main import app
+    from app.core.http_client import close_http_client
+    from app.core.session_memory import close_redis
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"{'concurrency':>12} {'seconds':>10} {'req/s':>10}")
+        for level in args.concurrency:
+            elapsed = await run_level(client, args.requests, level)
+            print(f"{level:>12} {elapsed:>10.2f} {args.requests / elapsed:>10.1f}")
+    await close_redis()
+    await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with StubServer(make_llm_app(args.llm_latency)) as llm, StubServer(make_search_app(args.search_latency)) as search:
+        os.environ["OPENROUTER_API_KEY"] = "stub"
+        os.environ["OPENROUTER_API_URL"] = f"{llm.url}/api/v1/chat/completions"
+        os.environ["SEARCHAPI_API_KEY"] = "stub"
+        os.environ["SEARCHAPI_URL"] = f"{search.url}/api/v1/search"
+        os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+        asyncio.run(main(args))
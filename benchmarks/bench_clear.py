@@ -0,0 +1,95 @@
+"""Chroma clear and document deletion: the old get()-everything-then-delete
+clear vs drop-and-recreate, and query behaviour while a large document is
+deleted page by page.
+
+    python -m benchmarks.bench_clear --chunks 200000 --doc-chunks 20000
+
+Peak RSS is process-wide and only grows, so the new clear runs first. While a
+document is being deleted, a background thread keeps querying it; "partial"
+counts answers that held some but not all of the k requested chunks.
+"""
+import argparse
+import os
+import resource
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load(vs, vecs, doc_chunks, batch=5000):
+    for start in range(0, len(vecs), batch):
+        part = vecs[start:start + batch]
+        ids = range(start, start + len(part))
+        # The first doc_chunks rows form one large document
+        vs.add_chunks([f"chunk {i} " + "lorem ipsum " * 40 for i in ids], part.tolist(),
+                      [{"source": "big" if i < doc_chunks else f"doc{i // 200}", "page": i, "chunk": 1} for i in ids])
+
+
+def main(args):
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+    import chromadb
+    from app.core.vectorstore import ChromaVectorStore
+
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((args.chunks, args.dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    client = chromadb.PersistentClient(path=tempfile.mkdtemp(prefix="bench-clear-"))
+
+    def fresh():
+        for c in client.list_collections():
+            client.delete_collection(getattr(c, "name", c))
+        collection = client.create_collection("bench")
+        vs = ChromaVectorStore(collection, getattr(client, "max_batch_size", 5000), client)
+        load(vs, vecs, args.doc_chunks)
+        return vs
+
+    vs = fresh()
+    before, start = peak_mb(), time.perf_counter()
+    removed = vs.clear_all()
+    print(f"drop+recreate  {removed:>8} chunks {time.perf_counter() - start:>7.2f} s  peak RSS +{peak_mb() - before:>7.0f} MB")
+
+    vs = fresh()
+    before, start = peak_mb(), time.perf_counter()
+    results = vs.collection.get()
+    vs.collection.delete(ids=results["ids"])
+    print(f"get+delete     {len(results['ids']):>8} chunks {time.perf_counter() - start:>7.2f} s  peak RSS +{peak_mb() - before:>7.0f} MB")
+    del results
+
+    vs = fresh()
+    stop = threading.Event()
+    latencies, partial = [], 0
+
+    def query():
+        nonlocal partial
+        q = vecs[0]
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            hits = vs.similarity_search(q, args.k, {"source": "big"})
+            latencies.append(time.perf_counter() - t0)
+            partial += 0 < len(hits) < args.k
+
+    worker = threading.Thread(target=query)
+    worker.start()
+    start = time.perf_counter()
+    deleted = vs.delete_source("big", batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worker.join()
+    print(f"delete_source  {deleted:>8} chunks {elapsed:>7.2f} s  ({args.batch_size}/page) "
+          f"concurrent queries {len(latencies)}, p99 {np.percentile(latencies, 99) * 1000:.1f} ms, partial {partial}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--doc-chunks", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,94 @@
+"""Compact (quantized memmap) vector store vs Chroma: footprint, recall@10 and
+query latency on synthetic clustered embeddings.
+
+    python -m benchmarks.bench_compact_store --sizes 100000 1000000 --chroma-max 100000
+
+Chroma ingestion of 1M vectors takes a long time; ``--chroma-max`` skips it above
+that size. Recall is measured against exact float32 brute force.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+
+def dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def synthetic(rng, n, dim, clusters=256):
+    # Clustered unit vectors: neighbours are close but not trivially separated
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    vecs = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True), centers
+
+
+def load(vs, vecs, batch=5000):
+    for start in range(0, len(vecs), batch):
+        part = vecs[start:start + batch]
+        ids = range(start, start + len(part))
+        vs.add_chunks([f"chunk {i}" for i in ids], part.tolist(), [{"source": f"doc{i // 200}", "page": i, "chunk": 1} for i in ids])
+
+
+def evaluate(vs, queries, truth, k):
+    latencies, hits = [], 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        docs = vs.similarity_search(q, k)
+        latencies.append(time.perf_counter() - start)
+        got = {int(d["metadata"]["page"]) for d in docs}
+        hits += len(got & set(expected.tolist()))
+    return hits / (len(queries) * k), float(np.percentile(latencies, 50)) * 1000, float(np.percentile(latencies, 99)) * 1000
+
+
+def main(args):
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+    import chromadb
+    from app.core.compact_store import CompactVectorStore
+    from app.core.vectorstore import ChromaVectorStore
+
+    rng = np.random.default_rng(0)
+    print(f"{'vectors':>9} {'backend':>14} {'build s':>8} {'disk MB':>9} {'scan MB':>8} {'rss +MB':>8} "
+          f"{'recall@' + str(args.k):>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for n in args.sizes:
+        vecs, centers = synthetic(rng, n, args.dim)
+        queries = centers[rng.integers(0, len(centers), args.queries)] + 0.6 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        truth = np.argsort(-(queries @ vecs.T), axis=1)[:, :args.k]
+
+        backends = [(f"compact-{q}", lambda d, q=q: CompactVectorStore(d, q, args.rescore_factor)) for q in args.quantization]
+        if n <= args.chroma_max:
+            backends.append(("chroma", lambda d: ChromaVectorStore(chromadb.PersistentClient(path=d).get_or_create_collection("bench"))))
+        for name, make in backends:
+            directory = tempfile.mkdtemp(prefix=f"bench-{name}-")
+            rss = rss_bytes()
+            start = time.perf_counter()
+            vs = make(directory)
+            load(vs, vecs)
+            vs.flush()
+            build = time.perf_counter() - start
+            recall, p50, p99 = evaluate(vs, queries, truth, args.k)
+            scan = vs.stats()["scan_bytes"] / 1e6 if hasattr(vs, "stats") else float("nan")
+            print(f"{n:>9} {name:>14} {build:>8.1f} {dir_bytes(directory) / 1e6:>9.1f} {scan:>8.1f} "
+                  f"{(rss_bytes() - rss) / 1e6:>8.1f} {recall:>9.3f} {p50:>8.2f} {p99:>8.2f}")
+            vs.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--quantization", nargs="+", default=["int8", "float16"])
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--chroma-max", type=int, default=100_000)
+    parser.add_argument("-k", type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,52 @@
+"""Query embedding throughput: per-call locked encode vs the micro-batcher.
+
+    python -m benchmarks.bench_embeddings --concurrency 1 8 64 --calls 512
+
+The persistent embedding cache is disabled and every concurrency level gets
+its own texts, so both columns measure model encoding rather than cache hits.
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run(fn, texts, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fn, texts))
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main(args):
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+    from app.core.embeddings import embed_text, get_model
+
+    model = get_model()
+    lock = threading.Lock()
+
+    def locked(text):
+        with lock:
+            return model.encode([text])[0]
+
+    def texts(tag):
+        return [f"What does section {i} of the {tag} report say about latency budgets?" for i in range(args.calls)]
+
+    # Warm up both paths (model load, thread start)
+    locked("warm-up")
+    embed_text("warm-up")
+
+    print(f"{'concurrency':>12} {'locked/s':>10} {'batched/s':>10} {'speedup':>8}")
+    for level in args.concurrency:
+        base = run(locked, texts(f"locked-{level}"), level)
+        batched = run(embed_text, texts(f"batched-{level}"), level)
+        print(f"{level:>12} {base:>10.1f} {batched:>10.1f} {batched / base:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--calls", type=int, default=512)
+    main(parser.parse_args())
@@ -0,0 +1,96 @@
+"""Recall@k and query latency for dense, BM25 and hybrid (RRF) retrieval.
+
+Builds a synthetic corpus where every chunk carries a unique part number.
+Half the queries ask about a part number (lexical), half reword the chunk's
+own detail sentence, a unique subject/symptom/place/time combination (semantic).
+Either way exactly one chunk is relevant, judged by id.
+
+    python -m benchmarks.bench_hybrid --chunks 5000 --queries 300 -k 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+TOPICS = ("turbine bearing lubrication schedule", "invoice approval workflow", "battery thermal runaway",
+          "network firewall rule audit", "patient intake triage", "warehouse pallet routing",
+          "solar inverter efficiency", "contract termination clause", "hydraulic pump pressure",
+          "customer churn forecast", "aircraft de-icing procedure", "gdpr data retention policy")
+SUBJECTS = ("the coolant valve", "the backup generator", "the login service", "the conveyor belt", "the cooling fan",
+            "the payroll export", "the pressure sensor", "the door actuator", "the billing job", "the drive motor",
+            "the ventilation duct", "the label printer")
+SYMPTOMS = ("kept overheating", "failed after midnight", "leaked slowly", "made a grinding noise", "stopped responding",
+            "drifted out of calibration", "tripped the breaker", "reported stale data", "vibrated heavily", "ran at half speed")
+PLACES = ("in the north plant", "at the harbour depot", "in building seven", "at the night shift", "in the test lab",
+          "at the regional office", "in the cold store", "on the rooftop", "in the basement", "at the loading bay")
+WHEN = ("on monday", "during the audit", "after the upgrade", "before the holidays", "over the weekend")
+FILLER = "system report section figure value result process method analysis review standard level".split()
+
+
+def build_corpus(n, rng):
+    details = [(s, y, f"{p} {w}") for s in SUBJECTS for y in SYMPTOMS for p in PLACES for w in WHEN]
+    if n > len(details):
+        raise ValueError(f"at most {len(details)} chunks have a unique detail sentence")
+    chunks, id_queries, semantic_queries = [], [], []
+    for i, (subject, symptom, place) in enumerate(rng.sample(details, n)):
+        topic = rng.choice(TOPICS)
+        part = f"PN-{rng.randrange(10000, 99999)}-{i}"
+        words = [rng.choice(FILLER) for _ in range(120)]
+        cid = f"bench::p{i}::c1"
+        text = (f"{topic.capitalize()}. Component {part} is covered here. "
+                f"{subject.capitalize()} {symptom} {place}. " + " ".join(words))
+        chunks.append((cid, text, {"source": "bench", "page": i, "chunk": 1}))
+        id_queries.append((f"What does the manual say about {part}?", cid))
+        semantic_queries.append((f"Which incident says {subject} {symptom} {place}?", cid))
+    return chunks, id_queries, semantic_queries
+
+
+def main(args):
+    tmp = tempfile.mkdtemp(prefix="hybrid-bench-")
+    os.environ["CHROMA_DIR"] = os.path.join(tmp, "chroma")
+    os.environ["LEXICAL_INDEX_DIR"] = os.path.join(tmp, "lexical")
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+    from app.core.embeddings import encode_texts
+    from app.core.lexical_index import get_lexical_index, reciprocal_rank_fusion
+    from app.core.vectorstore import get_vectorstore
+
+    rng = random.Random(0)
+    chunks, id_queries, semantic_queries = build_corpus(args.chunks, rng)
+    vs, lex = get_vectorstore(), get_lexical_index()
+    for start in range(0, len(chunks), 512):
+        batch = chunks[start:start + 512]
+        ids, texts, metas = zip(*batch)
+        vs.add_chunks(list(texts), encode_texts(list(texts)).tolist(), list(metas))
+        lex.upsert(list(ids), list(texts), list(metas))
+
+    queries = rng.sample(id_queries, args.queries // 2) + rng.sample(semantic_queries, args.queries - args.queries // 2)
+
+    n = max(args.k, 20)
+    modes = {
+        "dense": lambda q, e: vs.similarity_search(e, args.k),
+        "bm25": lambda q, e: lex.search(q, args.k),
+        "hybrid": lambda q, e: reciprocal_rank_fusion([vs.similarity_search(e, n), lex.search(q, n)], args.k),
+    }
+    embeddings = encode_texts([q for q, _ in queries])
+    print(f"{'mode':>8} {'recall@' + str(args.k):>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, fn in modes.items():
+        hits, timings = 0, []
+        for (q, target), emb in zip(queries, embeddings):
+            start = time.perf_counter()
+            results = fn(q, emb)
+            timings.append((time.perf_counter() - start) * 1000)
+            if any(r["id"] == target for r in results):
+                hits += 1
+        print(f"{name:>8} {hits / len(queries):>10.3f} {np.percentile(timings, 50):>9.2f} {np.percentile(timings, 99):>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("-k", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,81 @@
+"""Ingestion throughput over a generated corpus of synthetic PDFs.
+
+Each worker count runs in a fresh subprocess so peak RSS is comparable.
+
+    python -m benchmarks.bench_ingest --docs 8 --pages 200 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DATA_DIRS = ("CHROMA_DIR", "MANIFEST_DIR", "LEXICAL_INDEX_DIR", "EMBEDDING_CACHE_DIR", "HNSW_DIR", "COMPACT_STORE_DIR")
+
+WORDS = ("latency throughput retrieval embedding vector index chunk page document "
+         "model query cache batch worker queue memory stream token answer").split()
+
+
+def make_corpus(directory, docs, pages, seed=0):
+    import fitz
+
+    rng = random.Random(seed)
+    for d in range(docs):
+        pdf = fitz.open()
+        for _ in range(pages):
+            page = pdf.new_page()
+            text = " ".join(rng.choice(WORDS) for _ in range(450))
+            page.insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=8)
+        pdf.save(os.path.join(directory, f"synthetic_{d:03d}.pdf"))
+        pdf.close()
+
+
+def run_once(corpus, workers):
+    # Every data path under a fresh dir: no manifest skips, no warm embedding cache, no writes to ./data
+    data = tempfile.mkdtemp(prefix="ingest-bench-")
+    for name in DATA_DIRS:
+        os.environ[name] = os.path.join(data, name.lower())
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+    from app.core.embeddings import get_model
+    from app.ingest.ingest_pdfs import ingest
+
+    get_model()
+    start = time.perf_counter()
+    chunks = ingest(corpus, workers=workers)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"workers": workers, "seconds": elapsed, "chunks": chunks, "peak_rss_mb": peak_mb}))
+
+
+def main(args):
+    corpus = args.corpus or tempfile.mkdtemp(prefix="ingest-corpus-")
+    if not args.corpus:
+        make_corpus(corpus, args.docs, args.pages)
+    pages = args.docs * args.pages
+    print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'chunks/s':>9} {'peak MB':>9}")
+    for workers in args.workers:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_ingest", "--run-once", corpus, "--workers", str(workers)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{workers:>8} {r['seconds']:>9.2f} {pages / r['seconds']:>9.1f} "
+              f"{r['chunks'] / r['seconds']:>9.1f} {r['peak_rss_mb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--corpus", help="Reuse an existing directory of PDFs")
+    parser.add_argument("--run-once", metavar="CORPUS", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_once:
+        run_once(args.run_once, args.workers[0])
+    else:
+        main(args)
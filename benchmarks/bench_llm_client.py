@@ -0,0 +1,93 @@
+"""LLM client behaviour against a flaky local OpenRouter stand-in: success rate,
+upstream calls and latency with and without retries/coalescing.
+
+    python -m benchmarks.bench_llm_client --calls 200 --distinct 20 --fail-rate 0.3
+
+--agent-prompts builds each prompt with the real planner and reader prompt
+builders (timestamp included) instead of a fixed template, so the coalescing
+numbers reflect what the agents actually send.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from benchmarks.stubs import StubServer, make_llm_app
+
+
+def agent_prompt(i, distinct):
+    from app.agents.planner import PlannerAgent
+    from app.agents.reader_agent import ReaderAgent
+
+    question = f"What does the report say about topic {i % distinct}?"
+    if i % 2:
+        return PlannerAgent().build_prompt(question)
+    return ReaderAgent().build_prompt(question, [{"content": f"Section {i % distinct} covers the topic in detail."}])
+
+
+async def run(calls, distinct, concurrency, agent_prompts=False):
+    from app.core import llm_client
+    from app.core.http_client import close_http_client
+    from app.core.llm_client import llm_completion
+
+    llm_client._slots.clear()  # semaphores bind to the previous run's event loop
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one(i):
+        nonlocal failures
+        async with sem:
+            start = time.perf_counter()
+            try:
+                prompt = agent_prompt(i, distinct) if agent_prompts else f"Answer question {i % distinct} from the context."
+                await llm_completion(prompt)
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+    await close_http_client()
+    return elapsed, failures, latencies
+
+
+def main(args):
+    os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+    from app.config import settings
+
+    print(f"{'mode':>18} {'ok %':>7} {'upstream':>9} {'p50 ms':>9} {'p99 ms':>9} {'seconds':>8}")
+    modes = (
+        ("no retry", 0, False),
+        ("retry", args.retries, False),
+        ("retry+coalesce", args.retries, True),
+    )
+    for name, retries, coalesce in modes:
+        app = make_llm_app(args.latency, fail_rate=args.fail_rate, fail_status=args.fail_status, retry_after=args.retry_after)
+        with StubServer(app) as llm:
+            settings.openrouter_api_url = f"{llm.url}/api/v1/chat/completions"
+            settings.llm_max_retries = retries
+            settings.llm_coalesce = coalesce
+            settings.llm_backoff_base_seconds = args.backoff_base
+            elapsed, failures, latencies = asyncio.run(run(args.calls, args.distinct, args.concurrency, args.agent_prompts))
+            ok = 100.0 * (args.calls - failures) / args.calls
+            p50, p99 = (float(np.percentile(latencies, p)) * 1000 for p in (50, 99))
+            print(f"{name:>18} {ok:>7.1f} {app.state.calls:>9} {p50:>9.1f} {p99:>9.1f} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20, help="distinct prompts among the calls")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--fail-rate", type=float, default=0.3)
+    parser.add_argument("--fail-status", type=int, default=429)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--backoff-base", type=float, default=0.1)
+    parser.add_argument("--agent-prompts", action="store_true", help="build prompts with the planner/reader agents")
+    main(parser.parse_args())
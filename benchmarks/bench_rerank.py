@@ -0,0 +1,51 @@
+"""Cross-encoder rerank latency on CPU per candidate batch size, cold and cached.
+
+    python -m benchmarks.bench_rerank --batch-sizes 10 25 50 100 --repeats 5
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+
+def passage(rng, i):
+    words = ["latency", "throughput", "index", "vector", "cache", "prompt", "token", "model",
+             "retrieval", "chunk", "budget", "batch", "query", "score", "document", "page"]
+    return f"Section {i}. " + " ".join(rng.choice(words) for _ in range(180))
+
+
+def main(args):
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+    from app.core.reranker import Reranker, get_cross_encoder
+
+    rng = random.Random(0)
+    pool = [{"id": f"c{i}", "content": passage(rng, i), "metadata": {}} for i in range(max(args.batch_sizes))]
+    get_cross_encoder().predict([("warm up", pool[0]["content"])])
+
+    print(f"{'candidates':>10} {'cold p50 ms':>12} {'cold p99 ms':>12} {'pairs/s':>9} {'cached ms':>10}")
+    for size in args.batch_sizes:
+        cold, cached = [], []
+        for r in range(args.repeats):
+            # Fresh reranker (empty cache) per repeat so every pair is scored
+            reranker = Reranker(cache_size=10 * size, batch_size=args.predict_batch)
+            query = f"How does the system keep query {r} latency within budget?"
+            start = time.perf_counter()
+            reranker.rerank(query, pool[:size], args.k)
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            reranker.rerank(query, pool[:size], args.k)
+            cached.append(time.perf_counter() - start)
+        cold.sort()
+        p50 = statistics.median(cold)
+        p99 = cold[min(len(cold) - 1, int(round(0.99 * (len(cold) - 1))))]
+        print(f"{size:>10} {p50 * 1000:>12.1f} {p99 * 1000:>12.1f} {size / p50:>9.0f} {statistics.median(cached) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 25, 50, 75, 100])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--predict-batch", type=int, default=64, help="CrossEncoder.predict batch_size")
+    parser.add_argument("-k", type=int, default=5)
+    main(parser.parse_args())
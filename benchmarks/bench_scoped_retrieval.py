@@ -0,0 +1,80 @@
+"""Query latency as the corpus grows: whole collection vs a doc_id ``where``
+filter vs a dedicated per-namespace collection.
+
+    python -m benchmarks.bench_scoped_retrieval --sizes 10000 50000 200000 --chunks-per-doc 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) * 1000
+
+
+def fill(vs, rng, n, dim, start, chunks_per_doc, namespace=None):
+    for offset in range(0, n, 1000):
+        size = min(1000, n - offset)
+        vecs = rng.standard_normal((size, dim)).astype(np.float32)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        ids = range(start + offset, start + offset + size)
+        scope = {"namespace": namespace} if namespace else {}
+        vs.add_chunks(
+            [f"chunk {i}" for i in ids],
+            vecs.tolist(),
+            [{"source": f"doc{i // chunks_per_doc}", **scope, "page": i % chunks_per_doc, "chunk": 1} for i in ids],
+        )
+
+
+def measure(fn, queries):
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        timings.append(time.perf_counter() - start)
+    return percentile(timings, 50), percentile(timings, 99)
+
+
+def main(args):
+    os.environ["CHROMA_DIR"] = tempfile.mkdtemp(prefix="chroma-scope-bench-")
+    os.environ["NAMESPACE_COLLECTIONS"] = "true"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+    from app.core.vectorstore import close_vectorstore, get_vectorstore
+
+    rng = np.random.default_rng(0)
+    shared = get_vectorstore()
+    # The tenant's documents live in their own collection and, for the filter
+    # comparison, also inside the shared one
+    tenant = get_vectorstore("tenant")
+    fill(tenant, rng, args.chunks_per_doc, args.dim, 0, args.chunks_per_doc, "tenant")
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    target = "doc0"
+
+    print(f"{'corpus':>8} {'mode':>12} {'p50 ms':>9} {'p99 ms':>9}")
+    loaded = 0
+    for size in sorted(args.sizes):
+        fill(shared, rng, size - loaded, args.dim, loaded, args.chunks_per_doc)
+        loaded = size
+        modes = (
+            ("unscoped", lambda q: shared.similarity_search(q, args.k)),
+            ("where doc", lambda q: shared.similarity_search(q, args.k, {"source": target})),
+            ("namespace", lambda q: tenant.similarity_search(q, args.k)),
+        )
+        for name, fn in modes:
+            p50, p99 = measure(fn, queries)
+            print(f"{size:>8} {name:>12} {p50:>9.2f} {p99:>9.2f}")
+    close_vectorstore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--chunks-per-doc", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("-k", type=int, default=5)
+    main(parser.parse_args())
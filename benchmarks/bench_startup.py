@@ -0,0 +1,104 @@
+"""Startup cost: time to import app.main (and which heavy modules it pulls in),
+then time to /health, time to /ready and first vs second /v1/ask latency for
+a uvicorn process with the lifespan warm-up on and off.
+
+Requires a reachable Redis (REDIS_URL, default redis://localhost:6379/0); the
+LLM and web search are local stubs.
+
+    python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+from benchmarks.stubs import StubServer, free_port, make_llm_app, make_search_app
+
+HEAVY = ["torch", "sentence_transformers", "chromadb", "fitz", "langgraph", "langchain_core"]
+
+_IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                  "heavy": [m for m in {HEAVY!r} if m in sys.modules]}}))
+"""
+
+
+def import_time(env):
+    out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def wait_for(client, path, deadline, ok=(200,)):
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code in ok:
+                return
+        except Exception:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(path)
+
+
+def ask(client):
+    start = time.perf_counter()
+    resp = client.post("/v1/ask", json={"session_id": f"bench-{uuid.uuid4()}", "question": "What does the report say about latency?"})
+    resp.raise_for_status()
+    return time.perf_counter() - start
+
+
+def serve(env, warmup, timeout):
+    import httpx
+
+    port = free_port()
+    env = {**env, "WARMUP_ENABLED": str(warmup).lower()}
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"], env=env)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            deadline = start + timeout
+            wait_for(client, "/health", deadline)
+            health = time.perf_counter() - start
+            # Without warm-up /ready only checks Redis, so it passes as soon as the server is up
+            wait_for(client, "/ready", deadline)
+            ready = time.perf_counter() - start
+            return health, ready, ask(client), ask(client)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main(args, env):
+    print(f"{'run':>4} {'import s':>9}  heavy modules loaded by `import app.main`")
+    for run in range(args.runs):
+        probe = import_time(env)
+        print(f"{run:>4} {probe['seconds']:>9.2f}  {', '.join(probe['heavy']) or '-'}")
+    print(f"\n{'warm-up':>8} {'health s':>9} {'ready s':>8} {'1st ask s':>10} {'2nd ask s':>10}")
+    for warmup in (True, False):
+        for _ in range(args.runs):
+            health, ready, first, second = serve(env, warmup, args.timeout)
+            print(f"{'on' if warmup else 'off':>8} {health:>9.2f} {ready:>8.2f} {first:>10.2f} {second:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubServer(make_llm_app(args.llm_latency)) as llm, StubServer(make_search_app(0.05)) as search:
+        env = {
+            **os.environ,
+            "OPENROUTER_API_KEY": "stub",
+            "OPENROUTER_API_URL": f"{llm.url}/api/v1/chat/completions",
+            "SEARCHAPI_API_KEY": "stub",
+            "SEARCHAPI_URL": f"{search.url}/api/v1/search",
+            "REDIS_URL": os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+            "ANSWER_CACHE_ENABLED": "false",
+        }
+        main(args, env)
@@ -0,0 +1,65 @@
+"""Time-to-first-token of /v1/ask/stream vs full latency of /v1/ask.
+
+Runs against the stub LLM/SearchAPI servers; requires Redis (REDIS_URL,
+default redis://localhost:6379/0).
+
+    python -m benchmarks.bench_ttft --requests 20 --llm-latency 0.3 --token-delay 0.03
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from benchmarks.stubs import StubServer, make_llm_app, make_search_app
+
+
+async def main(args, base_url):
+    import httpx
+
+    blocking, ttft, stream_total = [], [], []
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        for i in range(args.requests):
+            body = {"session_id": f"bench-{uuid.uuid4()}", "question": f"question {i}"}
+            start = time.perf_counter()
+            (await client.post("/v1/ask", json=body)).raise_for_status()
+            blocking.append(time.perf_counter() - start)
+
+            body["session_id"] = f"bench-{uuid.uuid4()}"
+            start = time.perf_counter()
+            first = None
+            async with client.stream("POST", "/v1/ask/stream", json=body) as resp:
+                async for line in resp.aiter_lines():
+                    if first is None and line == "event: token":
+                        first = time.perf_counter() - start
+            ttft.append(first)
+            stream_total.append(time.perf_counter() - start)
+
+    ms = lambda xs: statistics.median(xs) * 1000
+    print(f"/v1/ask         median total      {ms(blocking):8.1f} ms")
+    print(f"/v1/ask/stream  median first token {ms(ttft):7.1f} ms")
+    print(f"/v1/ask/stream  median total      {ms(stream_total):8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with StubServer(make_llm_app(args.llm_latency, args.token_delay)) as llm, \
+            StubServer(make_search_app(args.search_latency)) as search:
+        os.environ["OPENROUTER_API_KEY"] = "stub"
+        os.environ["OPENROUTER_API_URL"] = f"{llm.url}/api/v1/chat/completions"
+        os.environ["SEARCHAPI_API_KEY"] = "stub"
+        os.environ["SEARCHAPI_URL"] = f"{search.url}/api/v1/search"
+        os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+        from app.main import app
+
+        # Serve the app over real HTTP: in-process ASGI transports buffer streamed bodies
+        with StubServer(app) as server:
+            asyncio.run(main(args, server.url))
@@ -0,0 +1,65 @@
+"""Per-query retrieval latency: new Chroma client per call vs the shared handle.
+
+    python -m benchmarks.bench_vectorstore_client --chunks 5000 --queries 200
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) * 1000
+
+
+def main(args):
+    tmp = tempfile.mkdtemp(prefix="chroma-bench-")
+    os.environ["CHROMA_DIR"] = tmp
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+    import chromadb
+    from app.core import vectorstore
+    from app.core.vectorstore import ChromaVectorStore, get_vectorstore, close_vectorstore
+
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((args.chunks, args.dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    vs = get_vectorstore()
+    for start in range(0, args.chunks, 1000):
+        batch = vecs[start:start + 1000]
+        vs.add_chunks(
+            [f"chunk {i}" for i in range(start, start + len(batch))],
+            batch.tolist(),
+            [{"source": "bench", "page": i, "chunk": 1} for i in range(start, start + len(batch))],
+        )
+    close_vectorstore()
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    def per_call(q):
+        client = chromadb.PersistentClient(path=vectorstore.settings.chroma_dir)
+        ChromaVectorStore(client.get_or_create_collection(vectorstore.COLLECTION_NAME)).similarity_search(q, args.k)
+
+    def shared(q):
+        get_vectorstore().similarity_search(q, args.k)
+
+    print(f"{'mode':>10} {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, fn in (("per-call", per_call), ("shared", shared)):
+        timings = []
+        for q in queries:
+            start = time.perf_counter()
+            fn(q)
+            timings.append(time.perf_counter() - start)
+        print(f"{name:>10} {statistics.mean(timings) * 1000:>10.2f} {percentile(timings, 50):>10.2f} {percentile(timings, 99):>10.2f}")
+    close_vectorstore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("-k", type=int, default=5)
+    main(parser.parse_args())
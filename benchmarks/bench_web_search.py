@@ -0,0 +1,67 @@
+"""Web search layer against a local SearchAPI stand-in: upstream calls and
+latency for repeated popular queries (cold, Redis-cached, concurrent
+singleflight) and for multi-query fan-out vs sequential searches.
+
+Requires a reachable Redis (REDIS_URL, default redis://localhost:6379/0).
+
+    python -m benchmarks.bench_web_search --requests 200 --distinct 10 --latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stubs import StubServer, make_search_app
+
+
+async def main(args, stub):
+    from app.core.http_client import close_http_client
+    from app.core.session_memory import close_redis, get_redis
+    from app.core.web_search import PREFIX, search_web
+
+    redis = get_redis()
+    keys = [key async for key in redis.scan_iter(match=f"{PREFIX}:*")]
+    if keys:
+        await redis.delete(*keys)
+
+    questions = [f"breaking news about topic {i % args.distinct}" for i in range(args.requests)]
+    print(f"{'scenario':>22} {'seconds':>9} {'upstream':>9}")
+
+    async def scenario(name, coro):
+        before = stub.state.calls
+        start = time.perf_counter()
+        await coro
+        print(f"{name:>22} {time.perf_counter() - start:>9.2f} {stub.state.calls - before:>9}")
+
+    # All requests at once: identical queries share one upstream call
+    await scenario("concurrent, cold", asyncio.gather(*(search_web(q) for q in questions)))
+    await scenario("concurrent, cached", asyncio.gather(*(search_web(q) for q in questions)))
+
+    reformulations = [f"reformulation {j} of the question" for j in range(args.fanout)]
+
+    async def sequential():
+        for q in ["fan-out question", *reformulations]:
+            await search_web(q, tbs="")
+
+    await scenario(f"{args.fanout + 1} queries, sequential", sequential())
+    await redis.delete(*[key async for key in redis.scan_iter(match=f"{PREFIX}:*")])
+    await scenario(f"{args.fanout + 1} queries, fan-out", search_web("fan-out question", reformulations, tbs=""))
+    await close_redis()
+    await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=10)
+    parser.add_argument("--fanout", type=int, default=3, help="reformulated queries besides the question")
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    app = make_search_app(args.latency)
+    with StubServer(app) as search:
+        os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+        os.environ["SEARCHAPI_API_KEY"] = "stub"
+        os.environ["SEARCHAPI_URL"] = f"{search.url}/api/v1/search"
+        os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+        asyncio.run(main(args, app))
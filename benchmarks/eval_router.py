@@ -0,0 +1,71 @@
+"""Offline evaluation of the fast-path planner router.
+
+Runs FastPathRouter over labelled questions against the ingested corpus
+(CHROMA_DIR) and reports the fast-path rate and the accuracy of fast-path
+decisions. With --compare-llm, escalated questions are also sent to the LLM
+planner (needs OPENROUTER_API_KEY) to measure agreement with the labels.
+
+Input is JSONL with {"question": ..., "expected": "RETRIEVE" | "SEARCH_WEB"}.
+
+    python -m benchmarks.eval_router benchmarks/data/router_eval_sample.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+
+
+def first_action(plan):
+    for step in plan:
+        if step.get("action") in ("RETRIEVE", "SEARCH_WEB"):
+            return step["action"]
+    return "ANSWER"
+
+
+async def main(args):
+    from app.agents.planner import PlannerAgent
+    from app.agents.retriever_agent import RetrieverAgent
+    from app.agents.router import FastPathRouter, router_stats
+    from app.core.embeddings import aembed_text
+
+    with open(args.dataset) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    fast_correct = fast_total = llm_correct = llm_total = 0
+    for row in rows:
+        question = row["question"]
+        embedding = await aembed_text(question)
+        retrieved = await RetrieverAgent().retrieve(question, k=5)
+        plan, info = await FastPathRouter().route(embedding, retrieved)
+        if plan is not None:
+            fast_total += 1
+            ok = first_action(plan) == row["expected"]
+            fast_correct += ok
+        elif args.compare_llm:
+            plan = await PlannerAgent().plan(question)
+            llm_total += 1
+            ok = first_action(plan) == row["expected"]
+            llm_correct += ok
+        else:
+            ok = None
+        if args.verbose:
+            print(f"{info['route']:>14} doc={info['doc_score']:.3f} web={info['web_similarity']:.3f} "
+                  f"expected={row['expected']:<10} ok={ok} | {question}")
+
+    stats = router_stats()
+    print(f"questions:       {len(rows)}")
+    print(f"fast-path rate:  {stats['fast_path_rate']:.1%} ({stats['fast_retrieve']} retrieve, {stats['fast_web']} web)")
+    if fast_total:
+        print(f"fast-path acc:   {fast_correct / fast_total:.1%}")
+    if llm_total:
+        print(f"LLM planner acc: {llm_correct / llm_total:.1%} on {llm_total} escalated")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dataset")
+    parser.add_argument("--compare-llm", action="store_true")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    os.environ.setdefault("OPENROUTER_API_KEY", "eval")
+    asyncio.run(main(args))
@@ -0,0 +1,109 @@
+"""Local stand-ins for OpenRouter and SearchAPI used by the benchmarks.
+
+Each stub is a tiny FastAPI app served by uvicorn on a background thread, so
+benchmarks exercise the real HTTP client path without external calls.
+"""
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_PLAN = '[{"action": "SEARCH_WEB"}, {"action": "ANSWER"}]'
+STUB_ANSWER = "Stub answer based on the provided context."
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_llm_app(latency: float = 0.2, token_delay: float = 0.02, fail_rate: float = 0.0,
+                 fail_status: int = 429, retry_after: float | None = None, seed: int = 0) -> FastAPI:
+    """OpenRouter stand-in: ``latency`` before the first byte, then (when
+    streaming) one SSE delta per word every ``token_delay`` seconds.
+
+    A ``fail_rate`` fraction of calls is answered with ``fail_status`` (plus a
+    Retry-After header when ``retry_after`` is set). ``app.state.calls`` and
+    ``app.state.failures`` count what the upstream actually saw.
+    """
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.failures = 0
+    rng = random.Random(seed)
+
+    @app.post("/api/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        if rng.random() < fail_rate:
+            app.state.failures += 1
+            headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+            return JSONResponse({"error": {"code": fail_status, "message": "stub failure"}}, status_code=fail_status, headers=headers)
+        await asyncio.sleep(latency)
+        prompt = body["messages"][0]["content"]
+        content = STUB_PLAN if "planning agent" in prompt else STUB_ANSWER
+        if body.get("stream"):
+            async def deltas():
+                yield ": OPENROUTER PROCESSING\n\n"
+                for word in content.split(" "):
+                    chunk = {"choices": [{"delta": {"content": word + " "}}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(token_delay)
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(deltas(), media_type="text/event-stream")
+        # Non-streaming callers wait for the whole generation
+        await asyncio.sleep(token_delay * len(content.split(" ")))
+        return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+    return app
+
+
+def make_search_app(latency: float = 0.1) -> FastAPI:
+    """SearchAPI stand-in. Every query shares https://example.com/1 and gets one
+    result of its own, so multi-query merging has duplicates to drop.
+    ``app.state.calls`` counts upstream requests."""
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.get("/api/v1/search")
+    async def search(q: str = ""):
+        app.state.calls += 1
+        await asyncio.sleep(latency)
+        slug = "-".join(q.lower().split())[:40]
+        return {"organic_results": [
+            {"title": f"Result for {q}", "link": "https://example.com/1", "snippet": "Stub snippet."},
+            {"title": f"More on {q}", "link": f"https://example.com/{slug}?utm_source=stub", "snippet": "Stub snippet."},
+        ]}
+
+    return app
+
+
+class StubServer:
+    """Run an ASGI app on 127.0.0.1 in a daemon thread."""
+
+    def __init__(self, app: FastAPI, port: int | None = None):
+        self.port = port or free_port()
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="off")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("hnswlib")
+pytest.importorskip("pydantic_settings")
+
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+
+from app.config import settings  # noqa: E402
+from app.core.hnsw_store import HnswVectorStore  # noqa: E402
+from app.ingest.manifest import load_manifest, save_manifest  # noqa: E402
+
+
+def _chunks(source, n, start=0):
+    rng = np.random.default_rng(start)
+    vecs = rng.standard_normal((n, 8)).astype(np.float32)
+    metas = [{"source": source, "page": 1, "chunk": start + i} for i in range(n)]
+    return [f"{source} chunk {start + i}" for i in range(n)], vecs.tolist(), metas
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "manifest_dir", str(tmp_path / "manifests"))
+    return str(tmp_path / "hnsw")
+
+
+def test_reopen_flushed_store(store_dir):
+    vs = HnswVectorStore(store_dir, persist_every=0)
+    vs.add_chunks(*_chunks("a", 10))
+    vs.delete_ids(["a::p1::c0"])
+    vs.close()
+
+    vs = HnswVectorStore(store_dir, persist_every=0)
+    assert vs.stats()["alive"] == 9
+    hits = vs.similarity_search(np.ones(8, dtype=np.float32), k=20)
+    assert len(hits) == 9
+    assert "a::p1::c0" not in {h["id"] for h in hits}
+    vs.close()
+
+
+def test_reopen_drops_unsaved_rows_and_their_manifests(store_dir):
+    vs = HnswVectorStore(store_dir, persist_every=0)
+    vs.add_chunks(*_chunks("a", 10))
+    vs.flush()
+    vs.add_chunks(*_chunks("b", 5, start=100))
+    save_manifest({"doc_id": "a", "chunks": {}})
+    save_manifest({"doc_id": "b", "chunks": {}})
+    # Simulate a crash: the rows of "b" reached SQLite but the index was never saved again
+    vs._conn.close()
+
+    vs = HnswVectorStore(store_dir, persist_every=0)
+    assert vs.stats()["alive"] == 10
+    assert {h["metadata"]["source"] for h in vs.similarity_search(np.ones(8, dtype=np.float32), k=20)} == {"a"}
+    assert load_manifest("a") is not None
+    assert load_manifest("b") is None
+    vs.close()